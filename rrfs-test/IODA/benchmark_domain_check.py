@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+"""
+Benchmark for the domain check pipeline in domain_check.py.
+
+Synthetic FV3-style grids (grid_lat/grid_lon), MPAS-style meshes (latCell/
+lonCell with or without cellsOnCell) and IODA-like obs files are generated
+at several sizes, and each stage of the pipeline is timed on its own:
+
+  grid stages: read_grid, boundary_edges (perimeter_ring, connectivity_edges
+               or alpha_shape), stitch_boundaries, build_domain (whole
+               boundary construction, no cache), domain_raster
+  obs stages:  read_coords, mask (bbox + raster), mask_no_raster,
+               write_copy (write_subset), write_flag, write_sidecar
+
+The obs stages are run against the domain of each grid kind at
+--obs-grid-size grid points. Results are written as JSON (a metadata block
+and one record per grid kind, size and stage) or CSV, so that runs can be
+compared to catch regressions, e.g.
+
+    benchmark_domain_check.py --output bench.json
+    benchmark_domain_check.py --grid-sizes 1e4 1e5 --obs-sizes 1e4 1e5 --format csv
+"""
+import netCDF4 as nc
+import numpy as np
+from timeit import default_timer as timer
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from domain_check import (read_grid, build_domain, domain_raster, domain_center, gnomonic, perimeter_ring,
+                          connectivity_edges, alpha_shape, stitch_boundaries, obs_lat_lon, domain_contains_points,
+                          write_subset, write_domain_flag, write_domain_index, peak_rss_mb)
+
+# Extent of the synthetic domains (degrees), about CONUS
+LON0, LON_SPAN = 226., 74.
+LAT0, LAT_SPAN = 21., 32.
+
+def write_fv3_grid(filename, npoints):
+    """
+    Curvilinear ny x nx FV3-style grid of about npoints points.
+    """
+    ny = max(int(np.sqrt(npoints * LAT_SPAN / LON_SPAN)), 2)
+    nx = max(npoints // ny, 2)
+    j, i = np.meshgrid(np.linspace(0, 1, ny), np.linspace(0, 1, nx), indexing='ij')
+    lat = LAT0 + LAT_SPAN * j + 3 * np.sin(np.pi * i)
+    lon = LON0 + LON_SPAN * i + 4 * (j - 0.5) * (i - 0.5)
+    with nc.Dataset(filename, 'w') as ds:
+        ds.createDimension('ny', ny)
+        ds.createDimension('nx', nx)
+        ds.createVariable('grid_lat', 'f8', ('ny', 'nx'))[:] = lat
+        ds.createVariable('grid_lon', 'f8', ('ny', 'nx'))[:] = lon
+    return ny * nx
+
+def write_mpas_grid(filename, npoints, connectivity=True):
+    """
+    MPAS-style hexagonal mesh of about npoints cells filling an ellipse, with
+    cellsOnCell/nEdgesOnCell (counterclockwise from east, nCells+1 for a
+    missing neighbor as in regional MPAS meshes) when connectivity is set.
+    """
+    # Lattice of hexagon centers; the ellipse covers pi/4 of its bounding box
+    dx = np.sqrt(LON_SPAN * LAT_SPAN / (np.sqrt(3) / 2 * npoints * 4 / np.pi))
+    dy = dx * np.sqrt(3) / 2
+    nx = int(LON_SPAN / dx) + 1
+    ny = int(LAT_SPAN / dy) + 1
+    row, col = np.meshgrid(np.arange(ny), np.arange(nx), indexing='ij')
+    lon = LON0 + (col + 0.5 * (row % 2)) * dx
+    lat = LAT0 + row * dy
+    cx, cy = LON0 + LON_SPAN / 2, LAT0 + LAT_SPAN / 2
+    inside = ((lon - cx) / (LON_SPAN / 2)) ** 2 + ((lat - cy) / (LAT_SPAN / 2)) ** 2 < 1
+    ncells = int(inside.sum())
+
+    with nc.Dataset(filename, 'w') as ds:
+        ds.createDimension('nCells', ncells)
+        ds.createVariable('latCell', 'f8', 'nCells')[:] = np.radians(lat[inside])
+        ds.createVariable('lonCell', 'f8', 'nCells')[:] = np.radians(lon[inside])
+        if connectivity:
+            cell_id = np.full((ny, nx), ncells + 1, dtype=np.int64)
+            cell_id[inside] = np.arange(1, ncells + 1)
+            r, c = row[inside], col[inside]
+            even = [(0, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0)]
+            odd = [(0, 1), (1, 1), (1, 0), (0, -1), (-1, 0), (-1, 1)]
+            cells_on_cell = np.empty((ncells, 6), dtype=np.int32)
+            for k in range(6):
+                nr = r + np.where(r % 2 == 0, even[k][0], odd[k][0])
+                nc_ = c + np.where(r % 2 == 0, even[k][1], odd[k][1])
+                ok = (nr >= 0) & (nr < ny) & (nc_ >= 0) & (nc_ < nx)
+                cells_on_cell[:, k] = ncells + 1
+                cells_on_cell[ok, k] = cell_id[nr[ok], nc_[ok]]
+            ds.createDimension('maxEdges', 6)
+            ds.createVariable('cellsOnCell', 'i4', ('nCells', 'maxEdges'))[:] = cells_on_cell
+            ds.createVariable('nEdgesOnCell', 'i4', 'nCells')[:] = 6
+    return ncells
+
+def write_obs(filename, nobs, nchan=0, seed=0):
+    """
+    IODA-like obs file with nobs Locations spread over a box about twice the
+    size of the synthetic domains, and (Location, Channel) variables when
+    nchan > 0.
+    """
+    rng = np.random.default_rng(seed)
+    with nc.Dataset(filename, 'w') as ds:
+        ds.createDimension('Location', nobs)
+        ds.createVariable('Location', 'i4', 'Location')[:] = 0
+        if nchan:
+            ds.createDimension('Channel', nchan)
+            ds.createVariable('Channel', 'i4', 'Channel')[:] = np.arange(1, nchan + 1)
+        metadata = ds.createGroup('MetaData')
+        lat = rng.uniform(LAT0 - LAT_SPAN / 2, LAT0 + 1.5 * LAT_SPAN, nobs)
+        lon = rng.uniform(LON0 - LON_SPAN / 2, LON0 + 1.5 * LON_SPAN, nobs) - 360.
+        metadata.createVariable('latitude', 'f4', 'Location', fill_value=-3.3687953e+38)[:] = lat
+        metadata.createVariable('longitude', 'f4', 'Location', fill_value=-3.3687953e+38)[:] = lon
+        metadata.createVariable('dateTime', 'i8', 'Location', fill_value=-9223372036854775806)[:] = 1716768000 + rng.integers(-1800, 1800, nobs)
+        dims = ('Location', 'Channel') if nchan else 'Location'
+        shape = (nobs, nchan) if nchan else nobs
+        for group, dtype, fill, value in [('ObsValue', 'f4', -3.3687953e+38, rng.normal(250., 5., shape)),
+                                          ('ObsError', 'f4', -3.3687953e+38, np.full(shape, 1.5)),
+                                          ('PreQC', 'i4', -2147483643, np.zeros(shape, dtype=np.int32))]:
+            ds.createGroup(group).createVariable('brightnessTemperature' if nchan else 'airTemperature', dtype, dims, fill_value=fill)[:] = value
+
+def time_stage(func, repeat):
+    """
+    Run func repeat times; return its last result and the elapsed times.
+    """
+    times = []
+    for _ in range(repeat):
+        tic = timer()
+        result = func()
+        times.append(timer() - tic)
+    return result, times
+
+def record(results, grid, grid_size, obs_size, stage, times, **extra):
+    entry = {'grid': grid, 'grid_size': grid_size, 'obs_size': obs_size, 'stage': stage,
+             'best_s': min(times), 'median_s': float(np.median(times)), 'times_s': times,
+             'peak_rss_mb': peak_rss_mb()}
+    entry.update(extra)
+    results.append(entry)
+    print(f"{grid:>11} grid={grid_size:>9} obs={obs_size if obs_size is not None else '-':>9} {stage:<18} "
+          f"best {min(times):9.4f}s  median {np.median(times):9.4f}s", file=sys.stderr, flush=True)
+
+def bench_grid(results, kind, grid_file, grid_size, shrink, raster_res, repeat):
+    """
+    Time the grid stages for one grid file; return the domain and its raster.
+    """
+    grid, times = time_stage(lambda: read_grid(grid_file), repeat)
+    record(results, kind, grid_size, None, 'read_grid', times)
+
+    points = gnomonic(domain_center(grid.lat, grid.lon), grid.lat, grid.lon)
+    if kind == 'fv3':
+        rings, times = time_stage(lambda: perimeter_ring(grid.shape), repeat)
+        record(results, kind, grid_size, None, 'boundary_edges', times, method='perimeter_ring')
+    else:
+        if kind == 'mpas':
+            edges, times = time_stage(lambda: connectivity_edges(grid.cells_on_cell, grid.n_edges_on_cell), repeat)
+            record(results, kind, grid_size, None, 'boundary_edges', times, method='connectivity_edges', n_edges=len(edges))
+        else:
+            edges, times = time_stage(lambda: alpha_shape(points, alpha=np.radians(0.25), only_outer=True), repeat)
+            record(results, kind, grid_size, None, 'boundary_edges', times, method='alpha_shape', n_edges=len(edges))
+        rings, times = time_stage(lambda: stitch_boundaries(edges), repeat)
+        record(results, kind, grid_size, None, 'stitch_boundaries', times, n_rings=len(rings))
+
+    domain, times = time_stage(lambda: build_domain(grid, shrink), repeat)
+    record(results, kind, grid_size, None, 'build_domain', times, n_vertices=len(domain.path.vertices))
+    raster, times = time_stage(lambda: domain_raster(domain, raster_res), repeat)
+    record(results, kind, grid_size, None, 'domain_raster', times, raster_res=raster_res)
+    return domain, raster
+
+def bench_obs(results, kind, grid_size, domain, raster, obs_file, obs_size, workdir, chunk_size, exact_max, repeat):
+    """
+    Time the obs stages for one obs file against one domain.
+    """
+    with nc.Dataset(obs_file, 'r') as obs_ds:
+        (obs_lat, obs_lon), times = time_stage(lambda: obs_lat_lon(obs_ds), repeat)
+    record(results, kind, grid_size, obs_size, 'read_coords', times)
+    coords = np.vstack((obs_lon, obs_lat)).T
+
+    inside_domain, times = time_stage(lambda: domain_contains_points(domain, coords, raster), repeat)
+    ninside = int(np.count_nonzero(inside_domain))
+    record(results, kind, grid_size, obs_size, 'mask', times, n_inside=ninside)
+    if obs_size <= exact_max:
+        mask, times = time_stage(lambda: domain_contains_points(domain, coords), repeat)
+        record(results, kind, grid_size, obs_size, 'mask_no_raster', times, n_inside=ninside, same=bool(np.array_equal(mask, inside_domain)))
+
+    outfile = os.path.join(workdir, 'obs_dc.nc')
+    with nc.Dataset(obs_file, 'r') as obs_ds:
+        _, times = time_stage(lambda: write_subset(obs_ds, outfile, inside_domain, chunk_size), repeat)
+    record(results, kind, grid_size, obs_size, 'write_copy', times, output_mb=os.path.getsize(outfile) / 1024. ** 2)
+    os.remove(outfile)
+
+    flag_file = os.path.join(workdir, 'obs_flag.nc')
+    shutil.copy(obs_file, flag_file)
+    with nc.Dataset(flag_file, 'a') as obs_ds:
+        _, times = time_stage(lambda: write_domain_flag(obs_ds, inside_domain), repeat)
+    record(results, kind, grid_size, obs_size, 'write_flag', times)
+    os.remove(flag_file)
+
+    index_file = os.path.join(workdir, 'obs_dc_index.nc')
+    _, times = time_stage(lambda: write_domain_index(index_file, obs_file, inside_domain), repeat)
+    record(results, kind, grid_size, obs_size, 'write_sidecar', times, output_mb=os.path.getsize(index_file) / 1024. ** 2)
+    os.remove(index_file)
+
+def metadata(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'host': platform.node(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'netCDF4': nc.__version__, 'git_commit': commit, 'cpu_count': os.cpu_count(),
+            'arguments': {key: value for key, value in vars(args).items() if key not in ('output', 'workdir')}}
+
+def write_results(results, meta, output, fmt):
+    out = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        if fmt == 'json':
+            json.dump({'metadata': meta, 'results': results}, out, indent=1)
+            out.write('\n')
+        else:
+            columns = ['grid', 'grid_size', 'obs_size', 'stage', 'best_s', 'median_s', 'peak_rss_mb']
+            extra = sorted({key for entry in results for key in entry} - set(columns) - {'times_s'})
+            writer = csv.DictWriter(out, fieldnames=columns + extra, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(results)
+    finally:
+        if output:
+            out.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the domain check stages on synthetic grids and obs.')
+    parser.add_argument('--grids', nargs='+', choices=['fv3', 'mpas', 'mpas-alpha'], default=['fv3', 'mpas', 'mpas-alpha'],
+                        help='grid kinds: FV3 grid, MPAS mesh with connectivity, MPAS mesh without it (alpha shape)')
+    parser.add_argument('--grid-sizes', nargs='+', type=float, default=[1e4, 1e5, 1e6, 1e7], help='grid points (default 1e4 1e5 1e6 1e7)')
+    parser.add_argument('--obs-sizes', nargs='+', type=float, default=[1e4, 1e5, 1e6, 1e7], help='obs Locations (default 1e4 1e5 1e6 1e7)')
+    parser.add_argument('--obs-grid-size', type=float, default=1e6, help='grid size whose domain the obs stages use (default 1e6)')
+    parser.add_argument('--alpha-max', type=float, default=1e6, help='largest grid for the alpha shape (Delaunay) path (default 1e6)')
+    parser.add_argument('--exact-max', type=float, default=1e6, help='largest obs file for the mask_no_raster stage (default 1e6)')
+    parser.add_argument('--nchan', type=int, default=0, help='channels per Location in the obs files (default 0)')
+    parser.add_argument('--shrink', type=float, default=0.1, help='hull shrink factor (default 0.1)')
+    parser.add_argument('--raster-res', type=float, default=0.5, help='domain raster cell size in degrees (default 0.5)')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Locations per chunk when writing (default 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage; best and median are reported (default 3)')
+    parser.add_argument('--workdir', type=str, default=None, help='directory for the synthetic files (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='keep the synthetic files')
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', help='output format (default json)')
+    parser.add_argument('-o', '--output', type=str, default=None, help='output file (default stdout)')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='benchmark_domain_check_')
+    os.makedirs(workdir, exist_ok=True)
+    grid_sizes = sorted({int(size) for size in args.grid_sizes})
+    obs_sizes = sorted({int(size) for size in args.obs_sizes})
+    obs_grid_size = int(args.obs_grid_size)
+    results = []
+    try:
+        domains = {}
+        for kind in args.grids:
+            for size in sorted(set(grid_sizes) | {obs_grid_size}):
+                if kind == 'mpas-alpha' and size > args.alpha_max:
+                    continue
+                grid_file = os.path.join(workdir, f'grid_{kind}_{size}.nc')
+                if kind == 'fv3':
+                    npoints = write_fv3_grid(grid_file, size)
+                else:
+                    npoints = write_mpas_grid(grid_file, size, connectivity=(kind == 'mpas'))
+                domain, raster = bench_grid(results, kind, grid_file, npoints, args.shrink, args.raster_res, args.repeat)
+                if size == obs_grid_size:
+                    domains[kind] = (npoints, domain, raster)
+                if size not in grid_sizes:  # built only for the obs stages
+                    results[:] = [entry for entry in results if not (entry['grid'] == kind and entry['grid_size'] == npoints)]
+                if not args.keep:
+                    os.remove(grid_file)
+
+        for size in obs_sizes:
+            obs_file = os.path.join(workdir, f'obs_{size}.nc')
+            write_obs(obs_file, size, args.nchan)
+            for kind, (npoints, domain, raster) in domains.items():
+                bench_obs(results, kind, npoints, domain, raster, obs_file, size, workdir, args.chunk_size, args.exact_max, args.repeat)
+            if not args.keep:
+                os.remove(obs_file)
+    finally:
+        if not args.keep and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    write_results(results, metadata(args), args.output, args.format)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1070 @@
+#!/usr/bin/env python
+"""
+Domain check for IODA observation files: keep only the observations inside
+the domain of a regional FV3 or MPAS grid.
+
+The domain boundary is computed from a lat/lon grid file (see note in main()
+about the grid file) and the observations are tested against it.
+All geometry is done in a gnomonic projection centered on the domain, in
+which great circles are straight lines, so domains that cross the dateline
+or reach the poles (e.g. Alaska) are handled like any other.
+The boundary is the perimeter of a logically rectangular FV3 grid, the
+boundary cells of an MPAS mesh from its cellsOnCell connectivity, or, for
+an unstructured grid without connectivity, a concave hull (alpha shape) of
+the grid points. Each ring of the boundary is then pulled toward its own
+centroid by the fraction shrink (-s, e.g. 0.01 for 1%), and holes are grown
+by the same fraction, so that obs right at the edge of the grid are left
+out. The domain is therefore slightly smaller than the grid, most visibly
+near its corners.
+
+The module can be imported (e.g. from a converter or workflow task) or run
+as a script; offline_domain_check.py and offline_domain_check_satrad.py are
+thin command-line wrappers around main(). Typical use from Python:
+
+    grid = read_grid(grid_filename)
+    domain = build_domain(grid, shrink)
+    raster = domain_raster(domain, 0.5)
+    with nc.Dataset(obs_filename) as obs_ds:
+        inside_domain = obs_inside_domain(obs_ds, domain, raster)
+
+or, for the whole pipeline on several domains at once,
+
+    filter_obs_file(obs_filename, [(name, domain, raster), ...])
+
+Instead of a *_dc.nc copy of each obs file, main() can also mark the obs in
+place (--mode flag: MetaData/insideDomain, --mode preqc: PreQC value for the
+obs outside) or list them in a small *_dc_index.nc file (--mode sidecar).
+
+Only netCDF4, numpy and matplotlib.path are needed to filter; scipy is
+imported for the alpha shape only, and cartopy/pyplot only to draw --fig.
+"""
+import netCDF4 as nc
+import numpy as np
+from matplotlib.path import Path
+from timeit import default_timer as timer
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import warnings
+import os
+import glob
+import hashlib
+import re
+import resource
+import sys
+
+# Grid lat/lon (flattened) and what is known of its structure:
+# shape is (ny, nx) for a logically rectangular FV3 grid, cells_on_cell and
+# n_edges_on_cell are the MPAS mesh connectivity when the file has it.
+DomainGrid = namedtuple('DomainGrid', ['lat', 'lon', 'shape', 'cells_on_cell', 'n_edges_on_cell', 'dycore'])
+
+# Domain boundary: path is the (possibly compound) boundary Path in the
+# gnomonic projection about center, the unit vector at the domain center.
+Domain = namedtuple('Domain', ['path', 'center'])
+
+# Functions for calculating run times.
+def tic():
+    return timer()
+
+def toc(tic=tic, label=""):
+    toc = timer()
+    elapsed = toc-tic
+    hrs = int(elapsed // 3600)
+    mins = int((elapsed % 3600) // 60)
+    secs = int(elapsed % 3600 % 60)
+    print(f"{label}({elapsed:.2f}s), {hrs:02}:{mins:02}:{secs:02}, peak RSS: {peak_rss_mb():.1f} MB")
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+def alpha_shape(points, alpha, only_outer=True):
+    """
+    Solution from Iddo Hanniel (https://stackoverflow.com/questions/50549128/boundary-enclosing-a-given-set-of-points)
+    Compute the alpha shape (concave hull) of a set of points
+    :param points: np.array of shape (n,2) points.
+    :param alpha: alpha value.
+    :param only_outer: boolean value to specify if we keep only the outer border
+    or also inner edges.
+    :return: set of (i,j) pairs representing edges of the alpha-shape. (i,j) are
+    the indices in the points array.
+
+    All triangles are processed at once with numpy instead of one at a time:
+    the circumradii are computed as arrays and the boundary edges are the
+    undirected edges that occur exactly once among the kept triangles.
+    """
+    assert points.shape[0] > 3, "Need at least four points"
+
+    points = np.ma.getdata(points)
+    from scipy.spatial import Delaunay
+
+    tri = Delaunay(points)
+    simplices = tri.simplices
+    pa = points[simplices[:, 0]]
+    pb = points[simplices[:, 1]]
+    pc = points[simplices[:, 2]]
+    # Computing radius of triangle circumcircle
+    # www.mathalino.com/reviewer/derivation-of-formulas/derivation-of-formula-for-radius-of-circumcircle
+    a = np.sqrt((pa[:, 0] - pb[:, 0]) ** 2 + (pa[:, 1] - pb[:, 1]) ** 2)
+    b = np.sqrt((pb[:, 0] - pc[:, 0]) ** 2 + (pb[:, 1] - pc[:, 1]) ** 2)
+    c = np.sqrt((pc[:, 0] - pa[:, 0]) ** 2 + (pc[:, 1] - pa[:, 1]) ** 2)
+    s = (a + b + c) / 2.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        area = np.sqrt(s * (s - a) * (s - b) * (s - c))
+        circum_r = a * b * c / (4.0 * area)
+    return triangle_edges(simplices[circum_r < alpha], points.shape[0], only_outer)
+
+def triangle_edges(triangles, npoints, only_outer=True):
+    """
+    Edges of a set of consistently oriented triangles, as a set of (i,j)
+    pairs. With only_outer, edges shared by two triangles are dropped and
+    only the boundary edges (those that occur exactly once) are kept.
+    """
+    # Directed edges (ia,ib), (ib,ic), (ic,ia) of every triangle, in triangle order
+    directed = np.stack([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]], axis=1).reshape(-1, 2)
+    # Undirected key for each edge so that (i,j) and (j,i) are counted together
+    lo = np.minimum(directed[:, 0], directed[:, 1]).astype(np.int64)
+    hi = np.maximum(directed[:, 0], directed[:, 1]).astype(np.int64)
+    keys = lo * npoints + hi
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    if only_outer:
+        # if both neighboring triangles are in shape, it's not a boundary edge
+        assert counts.max(initial=1) <= 2, "Can't go twice over same directed edge right?"
+        first = first[counts == 1]
+    return set(map(tuple, directed[first].tolist()))
+
+def connectivity_edges(cells_on_cell, n_edges_on_cell):
+    """
+    Boundary edges of an MPAS mesh from its cellsOnCell/nEdgesOnCell
+    connectivity, with no triangulation of lat/lon. Two consecutive neighbors
+    n_k, n_k+1 of cell c (counterclockwise) form the dual triangle
+    (c, n_k, n_k+1) around the vertex they share; a triangle exists only if
+    both neighbors are inside the mesh. The boundary is then the edges that
+    belong to exactly one triangle. Cost is linear in nCells.
+    :param cells_on_cell: (nCells, maxEdges) 1-based neighbor indices; values
+    outside 1..nCells mark a missing neighbor at the domain edge.
+    :param n_edges_on_cell: (nCells,) number of valid neighbors per cell.
+    :return: set of (i,j) pairs, 0-based cell indices.
+    """
+    ncells, max_edges = cells_on_cell.shape
+    nbr = np.ma.getdata(cells_on_cell).astype(np.int64) - 1
+    nedges = np.maximum(np.ma.getdata(n_edges_on_cell).astype(np.int64), 1)[:, None]
+    slot = np.arange(max_edges)[None, :]
+    nxt = np.take_along_axis(nbr, (slot + 1) % nedges, axis=1)
+    cell = np.broadcast_to(np.arange(ncells)[:, None], nbr.shape)
+    # Each triangle is seen from each of its three cells; keep it once, from its lowest-numbered cell
+    keep = (slot < nedges) & (nbr >= 0) & (nbr < ncells) & (nxt >= 0) & (nxt < ncells) & (cell < nbr) & (cell < nxt)
+    triangles = np.stack([cell[keep], nbr[keep], nxt[keep]], axis=1)
+    return triangle_edges(triangles, ncells, only_outer=True)
+
+def stitch_boundaries(edges):
+    """
+    Sort the edges computed by alpha_shape into closed rings.
+    A node -> edges adjacency map is built once, so every step along a ring
+    is a lookup instead of a scan of the remaining edges. All rings are
+    returned (outer boundary, holes and separate pieces), not just one.
+    """
+    edge_list = list(edges)
+    starts_at = defaultdict(list)  # node -> edges (node, j)
+    ends_at = defaultdict(list)  # node -> edges (j, node)
+    for k, (i, j) in enumerate(edge_list):
+        starts_at[i].append(k)
+        ends_at[j].append(k)
+    used = np.zeros(len(edge_list), dtype=bool)
+
+    def next_edge(candidates):
+        while candidates and used[candidates[-1]]:
+            candidates.pop()
+        return candidates.pop() if candidates else None
+
+    boundary_lst = []
+    for k0, edge0 in enumerate(edge_list):
+        if used[k0]:
+            continue
+        used[k0] = True
+        boundary = [edge0]
+        last_edge = edge0
+        while edge0[0] != last_edge[1]:
+            j = last_edge[1]
+            k = next_edge(starts_at[j])
+            if k is not None:
+                edge_with_j = edge_list[k]
+            else:
+                k = next_edge(ends_at[j])
+                if k is None:  # open chain, nothing left to follow
+                    break
+                edge_with_j = edge_list[k][::-1]  # flip edge rep
+            used[k] = True
+            boundary.append(edge_with_j)
+            last_edge = edge_with_j
+
+        boundary_lst.append(boundary)
+    return boundary_lst
+
+def perimeter_ring(shape):
+    """
+    Boundary of a logically rectangular (ny, nx) grid such as the FV3
+    grid_lat/grid_lon: the first and last rows and columns of the 2-D array.
+    Returned in the same form as stitch_boundaries (a list holding one ring
+    of (i,j) edges), with i,j indices into the flattened grid.
+    """
+    ny, nx = shape
+    idx = np.arange(ny * nx).reshape(ny, nx)
+    ring = np.concatenate([idx[0, :-1], idx[:-1, -1], idx[-1, :0:-1], idx[:0:-1, 0]])
+    return [list(zip(ring.tolist(), np.roll(ring, -1).tolist()))]
+
+def shrink_boundary(points, centroid, factor=0.01):
+    new_points = []
+    for point in points:
+        direction = point - centroid
+        distance_to_centroid = np.linalg.norm(direction)
+        direction_normalized = direction / distance_to_centroid
+        new_point = point - factor * direction_normalized * distance_to_centroid
+        new_points.append(new_point)
+    return np.array(new_points)
+
+def boundary_path(points, rings, factor):
+    """
+    Build a (possibly compound) Path from the stitched boundary rings.
+    Each ring is shrunk toward its own centroid. Rings wound opposite to the
+    largest ring are holes and are grown instead, so the domain still shrinks.
+    """
+    ring_points = [np.asarray(points)[[i for i, j in ring]] for ring in rings]
+    areas = [0.5 * np.sum(p[:, 0] * np.roll(p[:, 1], -1) - np.roll(p[:, 0], -1) * p[:, 1]) for p in ring_points]
+    outer_sign = np.sign(areas[int(np.argmax(np.abs(areas)))])
+    vertices = []
+    codes = []
+    for p, area in zip(ring_points, areas):
+        centroid = np.nanmean(p, axis=0)
+        ring_factor = factor if np.sign(area) == outer_sign else -factor
+        p = shrink_boundary(p, centroid, factor=ring_factor)
+        vertices.extend([p, p[:1]])
+        codes.extend([Path.MOVETO] + [Path.LINETO] * (len(p) - 1) + [Path.CLOSEPOLY])
+    return Path(np.concatenate(vertices), codes)
+
+def unit_vectors(lat, lon):
+    """
+    (n,3) unit vectors on the sphere of lat/lon in degrees.
+    """
+    lat = np.radians(np.ma.getdata(lat))
+    lon = np.radians(np.ma.getdata(lon))
+    coslat = np.cos(lat)
+    return np.stack([coslat * np.cos(lon), coslat * np.sin(lon), np.sin(lat)], axis=-1)
+
+def domain_center(lat, lon):
+    """
+    Unit vector at the center of a regional grid: the normalized mean of the
+    unit vectors of the grid points. The whole grid must lie well inside the
+    hemisphere around it to be projected.
+    """
+    p = unit_vectors(lat, lon)
+    center = p.mean(axis=0)
+    center /= np.linalg.norm(center)
+    if np.min(p @ center) < 0.1:
+        raise ValueError("Grid is not a regional domain: it reaches more than ~84 degrees from its center.")
+    return center
+
+def tangent_basis(center):
+    """
+    East and north unit vectors of the plane tangent to the sphere at center.
+    """
+    east = np.cross([0., 0., 1.], center)
+    if np.linalg.norm(east) < 1e-6:  # domain centered on a pole, any east will do
+        east = np.array([0., 1., 0.])
+    east /= np.linalg.norm(east)
+    north = np.cross(center, east)
+    return east, north
+
+def gnomonic(center, lat, lon):
+    """
+    Gnomonic projection of lat/lon (degrees) onto the plane tangent to the
+    sphere at center. Great circles are straight lines in this plane, so a
+    boundary of great-circle arcs between grid points is an ordinary polygon
+    wherever the domain is on the globe. Units are the tangent of the angular
+    distance from center (about radians near the center). Points on the far
+    hemisphere have no projection and get nan.
+    :return: (n,2) projected points.
+    """
+    p = unit_vectors(lat, lon)
+    east, north = tangent_basis(center)
+    dist = p @ center
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xy = np.stack([p @ east, p @ north], axis=-1) / dist[:, None]
+    xy[dist <= 0] = np.nan
+    return xy
+
+def inverse_gnomonic(center, xy):
+    """
+    Lat/lon (degrees, lon in 0..360) of points xy of the gnomonic projection about center.
+    """
+    east, north = tangent_basis(center)
+    p = center + xy[:, :1] * east + xy[:, 1:] * north
+    p /= np.linalg.norm(p, axis=1)[:, None]
+    lat = np.degrees(np.arcsin(np.clip(p[:, 2], -1., 1.)))
+    lon = np.degrees(np.arctan2(p[:, 1], p[:, 0])) % 360.
+    return lat, lon
+
+def domain_raster(domain, res):
+    """
+    Coarse raster of the domain for domain_contains_points: a grid of cells
+    of about res degrees (in the projected plane) over the bounding box of
+    the boundary, each marked 0
+    (outside), 1 (inside) or 2 (crossed by the boundary). Cells touched by an
+    edge are found by sampling every edge at res/2 spacing and then widened
+    by one cell, so no crossed cell is missed. Any other cell lies wholly on
+    one side of the boundary, and its center decides the whole cell.
+    :return: (x0, y0, cell size, cell states) or None if res <= 0.
+    """
+    if res is None or res <= 0:
+        return None
+    domain_path = domain.path
+    res = np.radians(res)  # projected units are ~radians
+    x0, y0 = domain_path.vertices.min(axis=0)
+    x1, y1 = domain_path.vertices.max(axis=0)
+    nx = max(int(np.ceil((x1 - x0) / res)), 1)
+    ny = max(int(np.ceil((y1 - y0) / res)), 1)
+
+    # Cells whose center is inside (exact test, but only ny*nx points)
+    xc = x0 + (np.arange(nx) + 0.5) * res
+    yc = y0 + (np.arange(ny) + 0.5) * res
+    centers = np.stack(np.meshgrid(xc, yc), axis=-1).reshape(-1, 2)
+    state = exact_contains_points(domain_path, centers).reshape(ny, nx).astype(np.int8)
+
+    # Cells crossed by the boundary
+    crossed = np.zeros((ny, nx), dtype=bool)
+    for ring in domain_path.to_polygons():
+        p0 = ring[:-1]
+        p1 = ring[1:]
+        nsample = np.ceil(np.hypot(*(p1 - p0).T) / (0.5 * res)).astype(np.int64) + 1
+        edge = np.repeat(np.arange(len(p0)), nsample)
+        frac = (np.arange(nsample.sum()) - np.repeat(np.cumsum(nsample) - nsample, nsample)) / np.repeat(np.maximum(nsample - 1, 1), nsample)
+        samples = p0[edge] + frac[:, None] * (p1[edge] - p0[edge])
+        ix = np.clip(((samples[:, 0] - x0) / res).astype(np.int64), 0, nx - 1)
+        iy = np.clip(((samples[:, 1] - y0) / res).astype(np.int64), 0, ny - 1)
+        crossed[iy, ix] = True
+    widened = crossed.copy()
+    widened[1:, :] |= crossed[:-1, :]
+    widened[:-1, :] |= crossed[1:, :]
+    widened[:, 1:] |= widened[:, :-1].copy()
+    widened[:, :-1] |= widened[:, 1:].copy()
+    state[widened] = 2
+    return x0, y0, res, state
+
+def exact_contains_points(domain_path, coords):
+    """
+    Point-in-polygon test for a boundary_path, coords in the same plane. Path.contains_points treats the
+    rings of a compound path as a union, so the rings are tested one at a
+    time and combined with the even-odd rule to exclude holes.
+    """
+    inside = np.zeros(len(coords), dtype=bool)
+    for ring in domain_path.to_polygons():
+        inside ^= Path(ring).contains_points(coords)
+    return inside
+
+def domain_contains_points(domain, coords, raster=None):
+    """
+    Point-in-domain test for (lon, lat) coords in degrees. Cheap prefilters
+    run in front of the exact polygon test. Points farther in latitude from
+    the domain center than the farthest boundary vertex are outside. The
+    remaining points are projected like the boundary; points on the far
+    hemisphere or outside the bounding box of the boundary are outside. With
+    a raster from domain_raster, points in cells that are wholly inside or
+    outside are decided by a lookup, and only points in cells crossed by the
+    boundary get the exact test.
+    """
+    coords = np.ma.getdata(coords)
+    inside = np.zeros(len(coords), dtype=bool)
+    center_lat = np.degrees(np.arcsin(domain.center[2]))
+    radius = np.degrees(np.arctan(np.max(np.hypot(domain.path.vertices[:, 0], domain.path.vertices[:, 1]))))
+    candidates = np.flatnonzero(np.abs(coords[:, 1] - center_lat) <= radius)
+    xy = gnomonic(domain.center, coords[candidates, 1], coords[candidates, 0])
+    (x0, y0), (x1, y1) = domain.path.vertices.min(axis=0), domain.path.vertices.max(axis=0)
+    in_box = (xy[:, 0] >= x0) & (xy[:, 0] <= x1) & (xy[:, 1] >= y0) & (xy[:, 1] <= y1)  # nan compares False
+    candidates = candidates[in_box]
+    xy = xy[in_box]
+    x = xy[:, 0]
+    y = xy[:, 1]
+    if raster is not None:
+        rx0, ry0, res, state = raster
+        ny, nx = state.shape
+        ix = np.clip(((x - rx0) / res).astype(np.int64), 0, nx - 1)
+        iy = np.clip(((y - ry0) / res).astype(np.int64), 0, ny - 1)
+        cell_state = state[iy, ix]
+        inside[candidates[cell_state == 1]] = True
+        candidates = candidates[cell_state == 2]
+        xy = xy[cell_state == 2]
+    inside[candidates] = exact_contains_points(domain.path, xy)
+    return inside
+
+def copy_subset(invar, outvars, masks, chunk_size):
+    """
+    Copy the Locations flagged in each of masks from invar to the matching
+    one of outvars, reading and writing chunk_size Locations at a time. Each
+    chunk is read once for all outputs, and only one chunk of a variable is
+    in memory at once, so memory stays bounded whatever the file size.
+    Location must be the leading dimension (as in IODA); any trailing
+    dimensions (e.g. Channel) are read and written together with it.
+    """
+    nlocs = len(masks[0])
+    iout = [0] * len(outvars)
+    for start in range(0, nlocs, chunk_size):
+        keeps = [inside_domain[start:start + chunk_size] for inside_domain in masks]
+        nkeeps = [np.count_nonzero(keep) for keep in keeps]
+        if not any(nkeeps):
+            continue
+        data = invar[start:start + chunk_size]
+        for k, (outvar, keep, nkeep) in enumerate(zip(outvars, keeps, nkeeps)):
+            if nkeep == 0:
+                continue
+            outvar[iout[k]:iout[k] + nkeep] = data[keep]
+            iout[k] += nkeep
+
+def boundary_cache_file(cache_dir, grid_lat, grid_lon, method, shrink):
+    """
+    Name of the cached boundary for this grid. The key is a hash of the grid
+    lat/lon content (not the file itself, so restart files from different
+    cycles on the same mesh share one entry) plus the boundary method (alpha
+    value or perimeter), the shrink value and the projection.
+    """
+    h = hashlib.sha256()
+    for coord in (grid_lat, grid_lon):
+        h.update(np.ascontiguousarray(np.ma.getdata(coord)).tobytes())
+    h.update(f"method={method!r},shrink={shrink!r},projection=gnomonic".encode())
+    return os.path.join(cache_dir, f"domain_boundary_{h.hexdigest()[:32]}.npz")
+
+def save_boundary_cache(cache_file, domain, max_bytes):
+    """
+    Write the boundary to the cache, then remove the least recently used
+    entries until the cache directory is within max_bytes.
+    """
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, vertices=domain.path.vertices, codes=domain.path.codes, center=domain.center)
+    os.replace(tmp_file, cache_file)
+
+    cached = sorted(glob.glob(os.path.join(cache_dir, 'domain_boundary_*.npz')), key=os.path.getmtime, reverse=True)
+    total = 0
+    for cached_file in cached:
+        size = os.path.getsize(cached_file)
+        if total + size > max_bytes and cached_file != cache_file:
+            os.remove(cached_file)
+        else:
+            total += size
+
+def clear_boundary_cache(cache_dir):
+    for cached_file in glob.glob(os.path.join(cache_dir, 'domain_boundary_*.npz')):
+        os.remove(cached_file)
+
+def read_grid(grid_filename):
+    """
+    Read the grid lat/lon (degrees, flattened) from an FV3 grid spec file
+    (grid_lat/grid_lon) or an MPAS file (latCell/lonCell, plus cellsOnCell/
+    nEdgesOnCell when present) into a DomainGrid.
+    """
+    with nc.Dataset(grid_filename, 'r') as grid_ds:
+        if 'grid_lat' in grid_ds.variables and 'grid_lon' in grid_ds.variables:  # FV3 grid
+            grid_lat = grid_ds.variables['grid_lat'][:, :]
+            grid_lon = grid_ds.variables['grid_lon'][:, :]
+            return DomainGrid(grid_lat.flatten(), grid_lon.flatten(), grid_lat.shape, None, None, "FV3")
+        elif 'latCell' in grid_ds.variables and 'lonCell' in grid_ds.variables:  # MPAS grid
+            grid_lat = np.degrees(grid_ds.variables['latCell'][:])  # Convert radians to degrees
+            grid_lon = np.degrees(grid_ds.variables['lonCell'][:])  # Convert radians to degrees
+            if 'cellsOnCell' in grid_ds.variables and 'nEdgesOnCell' in grid_ds.variables:
+                cells_on_cell = grid_ds.variables['cellsOnCell'][:]
+                n_edges_on_cell = grid_ds.variables['nEdgesOnCell'][:]
+            else:
+                # no mesh connectivity in this file, fall back to the alpha shape
+                cells_on_cell = None
+                n_edges_on_cell = None
+            return DomainGrid(grid_lat, grid_lon, None, cells_on_cell, n_edges_on_cell, "MPAS")
+    raise ValueError("Unrecognized grid format: 'grid_lat'/'grid_lon' or 'latCell'/'lonCell' not found.")
+
+def build_domain(grid, shrink, alpha=0.25, cache_dir=None, cache_max_mb=100.):
+    """
+    Domain boundary of a DomainGrid, shrunk by the factor shrink, in the
+    gnomonic projection about the grid center. The boundary is the perimeter
+    of a logically rectangular grid, the boundary of the MPAS mesh
+    connectivity, or otherwise the alpha shape of the projected grid points
+    (alpha in degrees). With a cache_dir, the boundary is loaded from / saved
+    to the on-disk cache.
+    """
+    if grid.shape is not None:
+        boundary_method = 'perimeter'
+    elif grid.cells_on_cell is not None:
+        boundary_method = 'connectivity'
+    else:
+        boundary_method = alpha
+
+    # Reuse the domain boundary from the cache if this grid was seen before
+    cache_file = None if cache_dir is None else boundary_cache_file(cache_dir, grid.lat, grid.lon, boundary_method, shrink)
+    if cache_file is not None and os.path.isfile(cache_file):
+        with np.load(cache_file) as cached:
+            domain = Domain(Path(cached['vertices'], cached['codes']), cached['center'])
+        os.utime(cache_file)  # mark as recently used
+        print(f"Loaded domain boundary from cache: {cache_file}")
+        return domain
+
+    # Get the points along the edge of the domain and sort into rings
+    center = domain_center(grid.lat, grid.lon)
+    points = gnomonic(center, grid.lat, grid.lon)
+    if boundary_method == 'perimeter':
+        # Logically rectangular grid: take the outer ring of the 2-D array, no triangulation needed
+        edges_sorted = perimeter_ring(grid.shape)
+    elif boundary_method == 'connectivity':
+        # MPAS mesh: boundary cells come straight from the cellsOnCell connectivity
+        edges = connectivity_edges(grid.cells_on_cell, grid.n_edges_on_cell)
+        edges_sorted = stitch_boundaries(edges)
+    else:
+        edges = alpha_shape(points, alpha=np.radians(alpha), only_outer = True)
+        edges_sorted = stitch_boundaries(edges)
+
+    # Create a Path object for the polygon domain from all rings
+    # Shrink the hull boundary to avoid problems right at the boundary
+    domain = Domain(boundary_path(points, edges_sorted, shrink), center)
+
+    if cache_file is not None:
+        save_boundary_cache(cache_file, domain, cache_max_mb * 1024 * 1024)
+        print(f"Saved domain boundary to cache: {cache_file}")
+    return domain
+
+def obs_lat_lon(obs_ds):
+    """
+    Observation latitudes and longitudes of an open IODA file, with
+    longitudes in 0..360 like the grid.
+    """
+    obs_lat = obs_ds.groups['MetaData'].variables['latitude'][:]
+    obs_lon = obs_ds.groups['MetaData'].variables['longitude'][:]
+    obs_lon = np.where(obs_lon < 0, obs_lon + 360, obs_lon)
+    return obs_lat, obs_lon
+
+def obs_inside_domain(obs_ds, domain, raster=None):
+    """
+    Boolean mask over the Locations of an open IODA file, True for the
+    observations inside domain.
+    """
+    obs_lat, obs_lon = obs_lat_lon(obs_ds)
+
+    # Pair the observation lat/lon as coordinates
+    obs_coords = np.vstack((obs_lon, obs_lat)).T
+
+    # Check if each observation is within the domain
+    return domain_contains_points(domain, obs_coords, raster)
+
+def storage_options(invar, sizes, complevel=None):
+    """
+    createVariable keyword arguments that reproduce the zlib/shuffle/
+    fletcher32 filters and the chunking of invar in an output variable of
+    dimension sizes sizes (the subset Location length), with the chunk sizes
+    scaled to the new dimension sizes. A complevel (0-9) replaces the input
+    compression: 0 writes uncompressed, 1-9 zlib with shuffle at that level.
+    Variable-length strings keep the library defaults.
+    """
+    if invar.dtype == str:
+        return {}
+    filters = invar.filters() or {}
+    options = {'fletcher32': bool(filters.get('fletcher32'))}
+    if complevel is None:
+        if filters.get('zlib'):
+            options.update(zlib=True, complevel=filters.get('complevel', 4))
+        options['shuffle'] = bool(filters.get('shuffle'))
+    elif complevel > 0:
+        options.update(zlib=True, complevel=complevel, shuffle=True)
+    chunking = invar.chunking()
+    if chunking == 'contiguous':
+        if not (options.get('zlib') or options['fletcher32'] or options.get('shuffle')):
+            options['contiguous'] = True
+    elif chunking is not None:
+        # As many chunks along each dimension as the input chunk size needs,
+        # spread evenly so that the last chunk is not mostly padding
+        chunksizes = []
+        for chunk, size in zip(chunking, sizes):
+            nchunks = max(1, int(np.ceil(size / chunk)))
+            chunksizes.append(max(1, int(np.ceil(size / nchunks))))
+        options['chunksizes'] = chunksizes
+    return options
+
+def write_subset(obs_ds, outfile, inside_domain, chunk_size=100000, complevel=None):
+    """
+    Write a copy of the open IODA file obs_ds to outfile keeping only the
+    Locations flagged in inside_domain (see write_subsets).
+    """
+    write_subsets(obs_ds, [outfile], [inside_domain], chunk_size, complevel)
+
+def write_subsets(obs_ds, outfiles, masks, chunk_size=100000, complevel=None):
+    """
+    Write copies of the open IODA file obs_ds to outfiles, each keeping only
+    the Locations flagged in the matching one of masks, in a single pass
+    over the input. Variables of any rank with Location as leading dimension
+    are streamed with copy_subset; variables without a Location dimension
+    (e.g. Channel-only metadata) are copied as is.
+    Compression and chunking follow the input (see storage_options).
+    """
+    fouts = [nc.Dataset(outfile, 'w') for outfile in outfiles]
+
+    for fout, inside_domain in zip(fouts, masks):
+        # Create dimensions and their variables (Location, Channel, ...) in the new file
+        for dim in obs_ds.dimensions.values():
+            if dim.name == 'Location':
+                fout.createDimension(dim.name, np.count_nonzero(inside_domain))
+            else:
+                fout.createDimension(dim.name, None if dim.isunlimited() else len(dim))
+            if dim.name not in obs_ds.variables:
+                continue
+            invar = obs_ds.variables[dim.name]
+            fill = invar.getncattr('_FillValue') if '_FillValue' in invar.ncattrs() else None
+            sizes = [len(fout.dimensions[d]) for d in invar.dimensions]
+            fout.createVariable(dim.name, invar.dtype, invar.dimensions, fill_value=fill, **storage_options(invar, sizes, complevel))
+            if dim.name == 'Location':
+                fout.variables[dim.name][:] = 0
+            else:
+                fout.variables[dim.name][:] = invar[:]
+            for attr in invar.ncattrs():  # Attributes for the dimension variable
+                if '_FillValue' in attr: continue
+                fout.variables[dim.name].setncattr(attr, invar.getncattr(attr))
+
+        # Copy all non-grouped attributes into the new file
+        for attr in obs_ds.ncattrs():  # Attributes for the main file
+            fout.setncattr(attr, obs_ds.getncattr(attr))
+
+    # Copy all groups and variables into the new files, keeping only the variables in range
+    # (streamed in chunks of Locations, all channels/levels of a chunk at once)
+    groups = obs_ds.groups
+    for group in groups:
+        gs = [fout.createGroup(group) for fout in fouts]
+        for var in obs_ds.groups[group].variables:
+            invar = obs_ds.groups[group].variables[var]
+            vartype = invar.dtype
+            fill = invar.getncattr('_FillValue') if '_FillValue' in invar.ncattrs() else None
+            dimensions = invar.dimensions
+
+            # Create a new variable with the correct dimensions, compression and chunking
+            for fout, g in zip(fouts, gs):
+                sizes = [len(fout.dimensions[d]) for d in dimensions]
+                try:
+                    g.createVariable(var, vartype, dimensions, fill_value=fill, **storage_options(invar, sizes, complevel))
+                except (TypeError, ValueError):
+                    # e.g. object arrays of strings, not a netCDF primitive type
+                    g.createVariable(var, 'str', dimensions, fill_value=fill)
+
+            outvars = [g.variables[var] for g in gs]
+            if 'Location' in dimensions:
+                copy_subset(invar, outvars, masks, chunk_size)
+            else:  # e.g. Channel-only variables are copied as is
+                data = invar[:]
+                for outvar in outvars:
+                    outvar[:] = data
+
+            # Copy attributes for this variable
+            for outvar in outvars:
+                for attr in invar.ncattrs():
+                    if '_FillValue' in attr: continue
+                    outvar.setncattr(attr, invar.getncattr(attr))
+
+    for fout in fouts:
+        fout.close()
+
+def write_domain_flag(obs_ds, inside_domain, name='insideDomain'):
+    """
+    Add (or overwrite) the integer flag MetaData/<name> in an IODA file
+    opened for append: 1 for the Locations inside the domain, 0 outside.
+    """
+    metadata = obs_ds.groups['MetaData']
+    if name not in metadata.variables:
+        metadata.createVariable(name, 'i4', 'Location')
+    flag = metadata.variables[name]
+    flag[:] = inside_domain.astype(np.int32)
+    flag.setncattr('long_name', 'Observation location is inside the model domain (1) or not (0)')
+
+def write_domain_preqc(obs_ds, inside_domain, preqc_value, chunk_size=100000):
+    """
+    Set every PreQC variable of an IODA file opened for append to
+    preqc_value at the Locations outside the domain, leaving the others as
+    they are. Only chunks of chunk_size Locations that hold outside obs are
+    read and rewritten.
+    """
+    if 'PreQC' not in obs_ds.groups:
+        raise ValueError("No PreQC group in the obs file, use --mode flag or sidecar instead.")
+    preqc = obs_ds.groups['PreQC']
+    for var in preqc.variables:
+        qcvar = preqc.variables[var]
+        if 'Location' not in qcvar.dimensions:
+            continue
+        for start in range(0, len(inside_domain), chunk_size):
+            outside = ~inside_domain[start:start + chunk_size]
+            if not outside.any():
+                continue
+            qc = qcvar[start:start + chunk_size]
+            qc[outside] = preqc_value
+            qcvar[start:start + chunk_size] = qc
+
+def domain_index_file(obs_filename, name=None):
+    """
+    Name of the sidecar index file of an obs file, next to it, for the
+    domain called name when there are several.
+    """
+    return os.path.splitext(obs_filename)[0] + domain_suffix(name) + '_index.nc'
+
+def domain_suffix(name=None):
+    """
+    Suffix of the outputs for one domain: _dc, or _dc_<name> when several
+    domains are checked at once.
+    """
+    return '_dc' if name is None else f'_dc_{name}'
+
+def domain_names(grid_filenames, names=None):
+    """
+    Names of the domains of grid_filenames for output file and variable
+    names: the given names, or else the grid file names without extension.
+    Characters other than letters, digits and '_' are replaced by '_', and
+    duplicate names get _1, _2, ... appended.
+    """
+    if names is None:
+        names = [os.path.splitext(os.path.basename(grid_filename))[0] for grid_filename in grid_filenames]
+    elif len(names) != len(grid_filenames):
+        raise ValueError("Need one domain name per grid file.")
+    names = [re.sub(r'\W', '_', name) for name in names]
+    return [f'{name}_{names[:k].count(name) + 1}' if names.count(name) > 1 else name for k, name in enumerate(names)]
+
+def write_domain_index(index_file, obs_filename, inside_domain):
+    """
+    Write the Location indices (0-based) of the obs inside the domain to a
+    small sidecar netCDF file instead of copying the obs file.
+    """
+    with nc.Dataset(index_file, 'w') as fout:
+        fout.setncattr('source_file', os.path.basename(obs_filename))
+        fout.setncattr('source_nlocs', len(inside_domain))
+        fout.createDimension('Location', np.count_nonzero(inside_domain))
+        index = fout.createVariable('locationIndex', 'i4' if len(inside_domain) < 2**31 else 'i8', 'Location', zlib=True)
+        index[:] = np.flatnonzero(inside_domain)
+        index.setncattr('long_name', 'Index of the Location in source_file of observations inside the model domain')
+
+def read_domain_index(index_file):
+    """
+    Boolean Location mask of the source obs file from a sidecar index file.
+    """
+    with nc.Dataset(index_file, 'r') as index_ds:
+        inside_domain = np.zeros(int(index_ds.getncattr('source_nlocs')), dtype=bool)
+        inside_domain[index_ds.variables['locationIndex'][:]] = True
+    return inside_domain
+
+def obs_file_list(patterns):
+    """
+    Expand the --obs arguments into a list of obs files. Each argument may be
+    a file or a glob pattern (quoted so that the shell leaves it alone);
+    outputs of a previous run (*_dc*.nc) picked up by a pattern are skipped.
+    Patterns that match nothing are returned as is so they fail visibly.
+    """
+    obs_files = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = [f for f in sorted(glob.glob(pattern)) if not re.search(r'_dc(_\w+)?\.nc4?$', f)]
+            obs_files.extend(matches if matches else [pattern])
+        else:
+            obs_files.append(pattern)
+    return list(dict.fromkeys(obs_files))  # drop duplicates, keep order
+
+def filter_obs_file(obs_filename, domains, chunk_size=100000, mode='copy', preqc_value=None, complevel=None):
+    """
+    Apply the domain check to obs_filename for each of domains, a list of
+    (name, Domain, raster) tuples; the obs coordinates are read once and the
+    file contents at most once for all domains. Depending on mode, the obs
+    that fall inside a domain are written to a new *_dc.nc file ('copy'),
+    marked in the file itself with a MetaData/insideDomain flag ('flag') or
+    with preqc_value in the PreQC group for the obs outside ('preqc'), or
+    listed in a *_dc_index.nc sidecar file ('sidecar'). With several domains
+    there is one output or flag per domain (*_dc_<name>.nc,
+    MetaData/insideDomain_<name>, ...); 'preqc' takes a single domain.
+    complevel sets the output compression of 'copy' (default: as the input).
+    Runs in a worker process in batch mode, so it only takes picklable
+    arguments and returns its counts and timing instead of printing.
+    :return: (output files, total obs, {name: obs inside domain}, elapsed seconds, peak RSS in MB)
+    """
+    tic1 = tic()
+    if mode == 'preqc' and len(domains) > 1:
+        raise ValueError("--mode preqc takes a single domain.")
+    with nc.Dataset(obs_filename, 'a' if mode in ('flag', 'preqc') else 'r') as obs_ds:
+        # Read the obs coordinates once and check them against every domain
+        obs_lat, obs_lon = obs_lat_lon(obs_ds)
+        obs_coords = np.vstack((obs_lon, obs_lat)).T
+        masks = [domain_contains_points(domain, obs_coords, raster) for name, domain, raster in domains]
+        names = [name for name, domain, raster in domains] if len(domains) > 1 else [None]
+
+        if mode == 'copy':
+            # Create new NetCDF files to store the selected data using the more efficient method
+            root, ext = os.path.splitext(obs_filename)
+            outfiles = [f'{root}{domain_suffix(name)}{ext}' for name in names]
+            write_subsets(obs_ds, outfiles, masks, chunk_size, complevel)
+        elif mode == 'flag':
+            outfiles = [obs_filename]
+            for name, inside_domain in zip(names, masks):
+                write_domain_flag(obs_ds, inside_domain, 'insideDomain' if name is None else f'insideDomain_{name}')
+        elif mode == 'preqc':
+            outfiles = [obs_filename]
+            write_domain_preqc(obs_ds, masks[0], preqc_value, chunk_size)
+        elif mode == 'sidecar':
+            outfiles = [domain_index_file(obs_filename, name) for name in names]
+            for outfile, inside_domain in zip(outfiles, masks):
+                write_domain_index(outfile, obs_filename, inside_domain)
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+    ninside = {name: np.count_nonzero(inside_domain) for (name, domain, raster), inside_domain in zip(domains, masks)}
+    return outfiles, len(obs_lat), ninside, timer() - tic1, peak_rss_mb()
+
+def report_obs_file(obs_filename, get_result):
+    """
+    Get the result of filter_obs_file for obs_filename from get_result (a
+    future's result method, or the call itself when running serially) and
+    print a one-line summary. Returns None if the file failed.
+    """
+    try:
+        result = get_result()
+    except Exception as e:
+        print(f"{obs_filename}: FAILED: {type(e).__name__}: {e}", flush=True)
+        return None
+    outfiles, ntotal, ninside, elapsed, rss = result
+    if len(ninside) == 1:
+        inside = f"{sum(ninside.values())} of {ntotal} obs inside domain"
+    else:
+        inside = f"{', '.join(f'{name}: {n}' for name, n in ninside.items())} of {ntotal} obs inside domains"
+    print(f"{obs_filename}: {inside} -> {' '.join(dict.fromkeys(outfiles))} ({elapsed:.2f}s, peak RSS: {rss:.1f} MB)", flush=True)
+    return result
+
+def run_batch(obs_files, domains, workers, **filter_options):
+    """
+    Filter all obs_files against the same domains, a list of (name, Domain,
+    raster) tuples, with a pool of worker processes when workers > 1.
+    filter_options are passed on to filter_obs_file (chunk_size, mode, ...).
+    Prints a line per file as it finishes and the aggregate timings; failures
+    are reported without stopping the batch.
+    :return: number of files that failed
+    """
+    tic1 = tic()
+    results = {}
+    if workers > 1 and len(obs_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(obs_files))) as pool:
+            futures = {pool.submit(filter_obs_file, obs_filename, domains, **filter_options): obs_filename for obs_filename in obs_files}
+            for future in as_completed(futures):
+                results[futures[future]] = report_obs_file(futures[future], future.result)
+    else:
+        for obs_filename in obs_files:
+            results[obs_filename] = report_obs_file(obs_filename, lambda: filter_obs_file(obs_filename, domains, **filter_options))
+
+    done = [r for r in results.values() if r is not None]
+    nfailed = len(obs_files) - len(done)
+    print(f"\nFiltered {len(done)} of {len(obs_files)} obs files with {workers} worker(s)"
+          f"{f', {nfailed} FAILED' if nfailed else ''}")
+    if done:
+        for name, domain, raster in domains:
+            print(f"  Obs inside domain{'' if len(domains) == 1 else f' {name}'}: {sum(r[2][name] for r in done)} of {sum(r[1] for r in done)}")
+        print(f"  Sum of per-file times: {sum(r[3] for r in done):.2f}s, slowest file: {max(r[3] for r in done):.2f}s")
+    toc(tic1, label="Time to filter all obs files: ")
+    if nfailed:
+        for obs_filename in obs_files:
+            if results[obs_filename] is None:
+                print(f"  FAILED: {obs_filename}")
+    return nfailed
+
+def plot_domain(domain, raster, grid_lat, grid_lon, obs_filename, dycore, hull_shrink_factor, figname):
+    # Plotting packages are only imported when a figure is requested
+    import matplotlib
+    matplotlib.use('agg')  # Set matplotlib backend
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as mticker
+    import cartopy
+    import cartopy.crs as ccrs
+    import cartopy.feature as cfeature
+    from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
+
+    # Plotting options
+    plot_box_width = 100. # define size of plot domain (units: lat/lon degrees)
+    plot_box_height = 50
+    cen_lat = 34.5
+    cen_lon = -97.5
+    #hull_shrink_factor = 0.10  #10% was found to work fairly well.
+
+    with nc.Dataset(obs_filename, 'r') as obs_ds:
+        obs_lat, obs_lon = obs_lat_lon(obs_ds)
+        inside_indices = np.where(obs_inside_domain(obs_ds, domain, raster))[0]
+
+    # Now create plot
+    # Set cartopy shapefile path
+    platform = os.getenv('HOSTNAME').upper()
+    if 'ORION' in platform:
+            cartopy.config['data_dir']='/work/noaa/fv3-cam/sdegelia/cartopy'
+    elif 'H' in platform: # Will need to improve this once Hercules is supported
+            cartopy.config['data_dir']='/home/Donald.E.Lippi/cartopy'
+
+    fig = plt.figure(figsize=(7,4))
+    m1 = fig.add_subplot(1, 1, 1, projection=ccrs.PlateCarree(central_longitude=0))
+    #m1 = fig.add_subplot(1, 1, 1, projection=ccrs.LambertConformal())
+    adjusted_lon = np.where(grid_lon > 180, grid_lon - 360, grid_lon)
+
+    # Determine extent for plot domain
+    half = plot_box_width / 2.
+    left = cen_lon - half
+    right = cen_lon + half
+    half = plot_box_height / 2.
+    bot = cen_lat - half
+    top = cen_lat + half
+
+    # Set extent for both plots
+    m1.set_extent([left, right, top, bot])
+
+    # Add features to the subplots
+    m1.add_feature(cfeature.COASTLINE)
+    m1.add_feature(cfeature.BORDERS)
+    m1.add_feature(cfeature.STATES)
+
+    # Gridlines for the subplots
+    gl1 = m1.gridlines(crs = ccrs.PlateCarree(), draw_labels = True, linewidth = 0.5, color = 'k', alpha = 0.25, linestyle = '-')
+    gl1.xlocator = mticker.FixedLocator([])
+    gl1.xlocator = mticker.FixedLocator(np.arange(-180., 181., 10.))
+    gl1.ylocator = mticker.FixedLocator(np.arange(-80., 91., 10.))
+    gl1.xformatter = LONGITUDE_FORMATTER
+    gl1.yformatter = LATITUDE_FORMATTER
+    gl1.xlabel_style = {'size': 5, 'color': 'gray'}
+    gl1.ylabel_style = {'size': 5, 'color': 'gray'}
+
+    # Plot the domain and the observations
+    #m1.fill(adjusted_lon.flatten(), grid_lat.flatten(), color='b', label='Domain Boundary', zorder=1, transform=ccrs.PlateCarree())
+    m1.scatter(adjusted_lon.flatten(), grid_lat.flatten(), c='b', s=1, label='Domain Boundary', zorder=2)
+    for iring, ring in enumerate(domain.path.to_polygons()):
+        ring_lat, ring_lon = inverse_gnomonic(domain.center, ring)
+        m1.plot(ring_lon, ring_lat, 'tab:purple', label='Concave Hull' if iring == 0 else None, zorder=10, transform=ccrs.Geodetic())
+
+    # Plot included observations
+    included_lat = obs_lat[inside_indices]
+    included_lon = obs_lon[inside_indices]
+    included_count = len(included_lat)
+    plt.scatter(included_lon, included_lat, c='g', s=2, label=f'Included Observations ({included_count})', zorder=3, transform=ccrs.PlateCarree())
+
+    # Plot excluded observations
+    excluded_indices = np.setdiff1d(np.arange(len(obs_lat)), inside_indices)
+    excluded_lat = obs_lat[excluded_indices]
+    excluded_lon = obs_lon[excluded_indices]
+
+    excluded_count = len(excluded_lat)
+    total_count = len(obs_lat)
+
+    print(f"Ob counts ({obs_filename}):")
+    print(f"  Excluded: {excluded_count}")
+    print(f"  Included: {included_count}")
+    print(f"  Total:    {total_count}")
+    plt.scatter(excluded_lon, excluded_lat, c='r', s=2, label=f'Excluded Observations ({excluded_count})', zorder=4, transform=ccrs.PlateCarree())
+
+    plt.xlabel('Longitude')
+    plt.ylabel('Latitude')
+    plt.legend(loc='upper right')
+    plt.title(f'{dycore} Domain and Observations ({hull_shrink_factor*100}%)')
+    plt.tight_layout()
+    plt.savefig(figname)
+    plt.close(fig)
+
+def main(argv=None):
+    tic1 = tic()
+
+    # Disable warnings
+    warnings.filterwarnings('ignore')
+
+    # Parse command-line arguments
+    # Note:
+    #    The grid file is what contains variables grid_lat/grid_lon
+    #    OR latCell/lonCell for FV3 and MPAS respectively.
+    #    Examples can be found in the following rrfs-test cases:
+    #      - rrfs-data_fv3jedi_2022052619/Data/bkg/fv3_grid_spec.nc
+    #      - mpas_2024052700/data/restart.2024-05-27_00.00.00.nc
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-g', '--grid', type=str, nargs='+', help='grid file(s), one per domain', required=True)
+    parser.add_argument('--domain-names', type=str, nargs='+', help='names of the domains in output file/variable names (default: grid file names)', default=None)
+    parser.add_argument('-o', '--obs', type=str, nargs='+', help='ioda observation file(s) or quoted glob pattern(s)', required=True)
+    parser.add_argument('-f', '--fig', action='store_true', help='disable figure (default is False)', required=False)
+    parser.add_argument('-s', '--shrink', type=float, help='fraction by which the domain boundary is shrunk toward its centroid', required=True)
+    parser.add_argument('-w', '--workers', type=int, help='number of obs files filtered in parallel (default 1)', default=1)
+    parser.add_argument('--raster-res', type=float, help='cell size in degrees of the coarse domain raster used to skip the exact polygon test (default 0.5, 0 disables)', default=0.5)
+    parser.add_argument('-m', '--mode', choices=['copy', 'flag', 'preqc', 'sidecar'], default='copy',
+                        help='copy: write the obs inside the domain to *_dc.nc (default); flag: add MetaData/insideDomain to the obs file; '
+                             'preqc: set PreQC to --preqc-value for the obs outside the domain; sidecar: write their indices to *_dc_index.nc')
+    parser.add_argument('--preqc-value', type=int, help='PreQC value for obs outside the domain with --mode preqc', default=None)
+    parser.add_argument('--complevel', type=int, choices=range(10), metavar='0-9', default=None,
+                        help='zlib level of the *_dc.nc output, 0 for none (default: same compression and chunking as the input)')
+    parser.add_argument('--chunk-size', type=int, help='number of Locations read/written at a time (default 100000)', default=100000)
+    parser.add_argument('--cache-dir', type=str, help='directory for cached domain boundaries',
+                        default=os.getenv('DOMAIN_CHECK_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'rdasapp', 'domain_check')))
+    parser.add_argument('--cache-max-mb', type=float, help='size cap of the boundary cache in MB (default 100)', default=100.)
+    parser.add_argument('--no-cache', action='store_true', help='always recompute the domain boundary', required=False)
+    parser.add_argument('--clear-cache', action='store_true', help='remove all cached domain boundaries first', required=False)
+    args = parser.parse_args(argv)
+    if args.mode == 'preqc' and args.preqc_value is None:
+        parser.error("--mode preqc requires --preqc-value")
+    if args.mode == 'preqc' and len(args.grid) > 1:
+        parser.error("--mode preqc takes a single grid file")
+    if args.domain_names is not None and len(args.domain_names) != len(args.grid):
+        parser.error("--domain-names needs one name per grid file")
+
+    # Assign filenames
+    obs_files = obs_file_list(args.obs)
+    grid_filenames = args.grid  # see note above.
+    names = domain_names(grid_filenames, args.domain_names)
+    make_fig = args.fig
+    hull_shrink_factor = args.shrink
+
+    print(f"Obs file(s): {' '.join(obs_files)}")
+    print(f"Grid file(s): {' '.join(grid_filenames)}")
+    if len(grid_filenames) > 1:
+        print(f"Domain names: {' '.join(names)}")
+    print(f"Figure flag: {args.fig}")
+    print(f"Hull shrink factor: {hull_shrink_factor}")
+    print(f"Workers: {args.workers}")
+    print(f"Mode: {args.mode}{f' (PreQC={args.preqc_value})' if args.mode == 'preqc' else ''}")
+    print(f"Raster resolution: {args.raster_res}")
+    print(f"Chunk size: {args.chunk_size}")
+    print(f"Output compression: {'as input' if args.complevel is None else args.complevel}")
+    print(f"Boundary cache: {'disabled' if args.no_cache else args.cache_dir}")
+
+    if args.clear_cache:
+        clear_boundary_cache(args.cache_dir)
+    grids = []
+    domains = []
+    for name, grid_filename in zip(names, grid_filenames):
+        # Extract the grid latitude and longitude
+        grid = read_grid(grid_filename)
+
+        print(f"\nDomain {name} ({grid.dycore}): {grid_filename}")
+        print(f"Max/Min Lat: {np.max(grid.lat)}, {np.min(grid.lat)}")
+        print(f"Max/Min Lon: {np.max(grid.lon)-360}, {np.min(grid.lon)-360}")
+
+        domain = build_domain(grid, hull_shrink_factor, cache_dir=None if args.no_cache else args.cache_dir, cache_max_mb=args.cache_max_mb)
+
+        # Coarse raster of the domain so that most obs skip the exact polygon test
+        raster = domain_raster(domain, args.raster_res)
+        grids.append(grid)
+        domains.append((name, domain, raster))
+    print()
+    toc(tic1,label="Time to build domain boundaries: " if len(domains) > 1 else "Time to build domain boundary: ")
+
+    # Filter every obs file against the same boundaries
+    nfailed = run_batch(obs_files, domains, args.workers, chunk_size=args.chunk_size,
+                        mode=args.mode, preqc_value=args.preqc_value, complevel=args.complevel)
+
+    if make_fig:
+        tic3 = tic()
+        print("Generating figure...")
+        for grid, (name, domain, raster) in zip(grids, domains):
+            for obs_filename in obs_files:
+                if not os.path.isfile(obs_filename):
+                    continue
+                figname = f'./domain_check_{grid.dycore}'
+                if len(domains) > 1:
+                    figname += f'_{name}'
+                if len(obs_files) > 1:
+                    figname += f'_{os.path.splitext(os.path.basename(obs_filename))[0]}'
+                plot_domain(domain, raster, grid.lat, grid.lon, obs_filename, grid.dycore, hull_shrink_factor, f'{figname}.png')
+        toc(tic3,label="Time to create figure: ")
+
+    toc(tic1,label="Total elapsed time: ")
+    return 1 if nfailed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
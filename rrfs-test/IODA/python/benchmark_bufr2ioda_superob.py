@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# (C) Copyright 2024 NOAA/NWS/NCEP/EMC
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+
+# Output size and running time of the superob of GOES cloud pixels (lgycld,
+# efclam) at several box sizes, for the mean, median and nearest-to-center
+# methods of the "superob" section of bufr2ioda_engine.py. The pixels are
+# synthetic: a jittered ~4 km scan over CONUS from two satellites, with the
+# lgycld variables. Only numpy is needed.
+#
+# usage:
+#       benchmark_bufr2ioda_superob.py [-n 2000000] [-b 0.05 0.1 0.25 0.5] [-r 3]
+
+import argparse
+import sys
+import numpy as np
+import numpy.ma as ma
+from timeit import default_timer as timer
+from bufr2ioda_utils import Bin_index, Superob_groups, Superob_mean, Superob_median, Superob_nearest
+
+METHODS = ('mean', 'median', 'nearest')
+
+
+def goes_pixels(n, rng):
+    """
+    Satellite id, latitude, longitude and n cloud values of n pixels.
+    """
+
+    satid = rng.choice(np.array([270, 272], dtype=np.int32), n)
+    lat = (rng.uniform(20, 55, n) + rng.normal(0, 0.01, n)).astype(np.float32)
+    lon = (rng.uniform(-135, -60, n) + rng.normal(0, 0.01, n)).astype(np.float32)
+    fields = [ma.array(rng.normal(50000, 20000, n).astype(np.float32), mask=rng.random(n) < 0.3) for _ in range(7)]
+    phase = ma.array(rng.integers(0, 4, n).astype(np.int32))
+    return satid, lat, lon, fields, phase
+
+
+def superob(satid, lat, lon, fields, phase, box, method):
+    """
+    Superobs of the pixels in box by box degree bins per satellite, as the
+    superob section of bufr2ioda_engine.py with the first field the value.
+    """
+
+    keep = np.flatnonzero(~ma.getmaskarray(fields[0]))
+    bins = [Bin_index(satid[keep]), Bin_index(lat[keep], box), Bin_index(lon[keep], box)]
+    order, starts = Superob_groups(bins)
+    order = keep[order]
+
+    count = Superob_mean(fields[0], order, starts)[1]
+    if method == 'nearest':
+        distance = np.zeros(len(lat))
+        for var in (lat, lon):
+            position = var.astype(np.float64) / box
+            distance += (position - np.floor(position) - 0.5)**2
+        representative = Superob_nearest(distance, order, starts)
+        superobs = [var[representative] for var in [lat, lon] + fields]
+    else:
+        reduce = Superob_median if method == 'median' else lambda var, order, starts: Superob_mean(var, order, starts)[0]
+        superobs = [reduce(ma.array(var), order, starts).astype(np.float32) for var in [lat, lon] + fields]
+        superobs.append(phase[order[starts]])
+    return superobs + [count.astype(np.int32)]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Output size and time of the GOES cloud superob at several box sizes.')
+    parser.add_argument('-n', '--pixels', type=int, default=2000000, help='number of pixels')
+    parser.add_argument('-b', '--boxes', nargs='+', type=float, default=[0.05, 0.1, 0.25, 0.5], help='box sizes (degrees)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='timed runs, the best is reported')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    satid, lat, lon, fields, phase = goes_pixels(args.pixels, rng)
+    size = sum(var.nbytes for var in [satid, lat, lon, phase] + fields)
+    print(f"{args.pixels} pixels, {size / 1e6:.1f} MB")
+    print(f"{'box (deg)':>9} {'method':>8} {'superobs':>9} {'size (MB)':>10} {'reduction':>10} {'time (s)':>9}")
+    failed = False
+    for box in args.boxes:
+        for method in METHODS:
+            times = []
+            for _ in range(args.repeat):
+                tic = timer()
+                superobs = superob(satid, lat, lon, fields, phase, box, method)
+                times.append(timer() - tic)
+            if superobs[-1].sum() != np.count_nonzero(~ma.getmaskarray(fields[0])):
+                print(f"Superob counts do not add up to the pixels used for box {box} {method}")
+                failed = True
+            superob_size = sum(var.nbytes for var in superobs)
+            print(f"{box:>9} {method:>8} {len(superobs[-1]):>9} {superob_size / 1e6:>10.2f} {size / superob_size:>9.0f}x {min(times):>9.3f}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
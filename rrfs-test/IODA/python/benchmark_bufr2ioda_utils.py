@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# (C) Copyright 2024 NOAA/NWS/NCEP/EMC
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+
+# Microbenchmark of the helpers in bufr2ioda_utils.py against the per-element
+# loops they replace, on synthetic masked arrays like those from r.get().
+# Each helper's output is checked to be identical (data, mask and fill value)
+# to the loop's before timing. Only numpy is needed.
+#
+# usage:
+#       benchmark_bufr2ioda_utils.py [-n 1000 100000 1000000] [-r 3]
+
+import argparse
+import calendar
+import copy
+import datetime
+import sys
+import numpy as np
+import numpy.ma as ma
+from timeit import default_timer as timer
+from bufr2ioda_utils import Mask_typ_for_var, Compute_dateTime, Compute_dateTime_from_fields
+from bufr2ioda_utils import Bin_index, Superob_groups, Superob_mean
+
+
+def Mask_typ_for_var_loop(typ, var):
+
+    typ_var = copy.deepcopy(typ)
+    for i in range(len(typ_var)):
+        if ma.is_masked(var[i]):
+            typ_var[i] = typ.fill_value
+
+    return typ_var
+
+
+def Compute_dateTime_loop(cycleTimeSinceEpoch, dhr):
+
+    int64_fill_value = np.int64(0)
+    dateTime = np.zeros(dhr.shape, dtype=np.int64)
+    for i in range(len(dateTime)):
+        if ma.is_masked(dhr[i]):
+            continue
+        else:
+            dateTime[i] = np.int64(dhr[i]) + cycleTimeSinceEpoch
+
+    dateTime = ma.array(dateTime)
+    dateTime = ma.masked_values(dateTime, int64_fill_value)
+
+    return dateTime
+
+
+def Compute_dateTime_from_fields_loop(year, month, day, hour, minute, second):
+    """
+    Reference for Compute_dateTime_from_fields using calendar.timegm per report.
+    """
+
+    dateTime = np.zeros(year.shape, dtype=np.int64)
+    for i in range(len(dateTime)):
+        fields = (year[i], month[i], day[i], hour[i], minute[i], second[i])
+        if any(ma.is_masked(field) for field in fields):
+            continue
+        dateTime[i] = calendar.timegm(tuple(int(field) for field in fields))
+
+    return ma.masked_values(dateTime, np.int64(0))
+
+
+def Superob_loop(keys, var):
+    """
+    Reference for Superob_groups and Superob_mean: mean, count and spread of
+    var per distinct key tuple, in key order.
+    """
+
+    groups = {}
+    for i in range(len(var)):
+        if not ma.is_masked(var[i]):
+            groups.setdefault(keys[i], []).append(float(var[i]))
+    mean = np.array([np.mean(groups[key]) for key in sorted(groups)])
+    count = np.array([len(groups[key]) for key in sorted(groups)])
+    spread = np.array([np.std(groups[key]) for key in sorted(groups)])
+    return mean, count, spread
+
+
+def Superob_vector(station, tilt, azimuth, gate_range, var):
+
+    keep = np.flatnonzero(~ma.getmaskarray(var))
+    bins = [Bin_index(station[keep]), Bin_index(tilt[keep]),
+            Bin_index(azimuth[keep], 5.0), Bin_index(gate_range[keep], 5000.0)]
+    order, starts = Superob_groups(bins)
+    return Superob_mean(var, keep[order], starts)
+
+
+def masked_obs(n, rng, dtype, fill_value, missing):
+    """
+    Masked array of n values with a fraction missing of them masked.
+    """
+    values = rng.integers(100, 300, n).astype(dtype)
+    return ma.array(values, mask=rng.random(n) < missing, fill_value=fill_value)
+
+
+def identical(a, b):
+    return (a.dtype == b.dtype and np.array_equal(ma.getmaskarray(a), ma.getmaskarray(b))
+            and a.filled().tobytes() == b.filled().tobytes() and a.fill_value == b.fill_value)
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        tic = timer()
+        func()
+        times.append(timer() - tic)
+    return min(times)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Time the bufr2ioda_utils helpers against the loops they replace.')
+    parser.add_argument('-n', '--sizes', nargs='+', type=int, default=[1000, 100000, 1000000], help='number of reports')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='timed runs, the best is reported')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    failed = False
+    print(f"{'function':<20} {'n':>9} {'loop (s)':>10} {'vector (s)':>11} {'speedup':>9}")
+    for n in args.sizes:
+        typ = masked_obs(n, rng, np.int32, np.int32(2147483647), 0.01)
+        var = masked_obs(n, rng, np.float32, np.float32(3.4028235e+38), 0.3)
+        if not identical(Mask_typ_for_var(typ, var), Mask_typ_for_var_loop(typ, var)):
+            print(f"Mask_typ_for_var differs from the loop for n = {n}")
+            failed = True
+        loop = best_time(lambda: Mask_typ_for_var_loop(typ, var), args.repeat)
+        vector = best_time(lambda: Mask_typ_for_var(typ, var), args.repeat)
+        print(f"{'Mask_typ_for_var':<20} {n:>9} {loop:>10.4f} {vector:>11.6f} {loop / vector:>8.0f}x")
+
+        # DHR offsets (hours) within +-3 h of the cycle, in seconds
+        cycleTimeSinceEpoch = np.int64(calendar.timegm((2024, 5, 27, 0, 0, 0)))
+        dhr = ma.array(rng.uniform(-3, 3, n).astype(np.float32), mask=rng.random(n) < 0.01) * 3600
+        if not identical(Compute_dateTime(cycleTimeSinceEpoch, dhr), Compute_dateTime_loop(cycleTimeSinceEpoch, dhr)):
+            print(f"Compute_dateTime differs from the loop for n = {n}")
+            failed = True
+        loop = best_time(lambda: Compute_dateTime_loop(cycleTimeSinceEpoch, dhr), args.repeat)
+        vector = best_time(lambda: Compute_dateTime(cycleTimeSinceEpoch, dhr), args.repeat)
+        print(f"{'Compute_dateTime':<20} {n:>9} {loop:>10.4f} {vector:>11.6f} {loop / vector:>8.0f}x")
+
+        # YEAR/MNTH/DAYS/HOUR/MINU/SECO over 1900-2100, including leap days
+        seconds = rng.integers(-2208988800, 4102444800, n)
+        fields = [ma.array(values.astype(np.int32), mask=rng.random(n) < 0.001) for values in
+                  np.array([datetime.datetime.fromtimestamp(int(t), datetime.timezone.utc).timetuple()[:6] for t in seconds]).T]
+        if not identical(Compute_dateTime_from_fields(*fields), Compute_dateTime_from_fields_loop(*fields)):
+            print(f"Compute_dateTime_from_fields differs from calendar.timegm for n = {n}")
+            failed = True
+        loop = best_time(lambda: Compute_dateTime_from_fields_loop(*fields), args.repeat)
+        vector = best_time(lambda: Compute_dateTime_from_fields(*fields), args.repeat)
+        print(f"{'dateTime_from_fields':<20} {n:>9} {loop:>10.4f} {vector:>11.6f} {loop / vector:>8.0f}x")
+
+        # Radial velocity gates of 3 radars, 3 tilts, in 5 degree by 5 km bins
+        station = np.array(['KAMA', 'KFWS', 'KTLX'])[rng.integers(0, 3, n)]
+        tilt = np.array([0.5, 0.9, 1.3], dtype=np.float32)[rng.integers(0, 3, n)]
+        azimuth = rng.uniform(0, 360, n).astype(np.float32)
+        gate_range = (rng.integers(1, 1840, n) * 125).astype(np.float32)
+        var = ma.array(rng.normal(0, 10, n).astype(np.float32), mask=rng.random(n) < 0.3)
+        keys = list(zip(station, tilt, np.floor(azimuth / 5.0).astype(int), np.floor(gate_range / 5000.0).astype(int)))
+        mean, count, spread = Superob_vector(station, tilt, azimuth, gate_range, var)
+        ref_mean, ref_count, ref_spread = Superob_loop(keys, var)
+        if not (np.array_equal(count, ref_count) and np.allclose(mean, ref_mean, atol=1e-4) and np.allclose(spread, ref_spread, atol=1e-4)):
+            print(f"Superob_mean differs from the loop for n = {n}")
+            failed = True
+        loop = best_time(lambda: Superob_loop(keys, var), args.repeat)
+        vector = best_time(lambda: Superob_vector(station, tilt, azimuth, gate_range, var), args.repeat)
+        print(f"{'Superob_mean':<20} {n:>9} {loop:>10.4f} {vector:>11.6f} {loop / vector:>8.0f}x"
+              f"   {n} gates -> {len(count)} superobs")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,837 @@
+#!/usr/bin/env python3
+# (C) Copyright 2024 NOAA/NWS/NCEP/EMC
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+
+# ====================================================================
+# Generic BUFR to IODA converter driven by the JSON configuration.
+#
+# Besides the usual keys (subsets, data_type, cycle_datetime, ...) the
+# configuration lists the IODA variables to write, in order:
+#
+#   "variables": [
+#     { "name": "MetaData/latitude", "query": "*/CLATH",
+#       "units": "degrees_north", "valid_range": [-90, 90], "long_name": "Latitude" },
+#     { "name": "ObsValue/airTemperature", "query": "*/T___INFO/T__EVENT{1}/TOB",
+#       "offset": 273.15, "units": "K", "long_name": "Air Temperature" },
+#     { "name": "MetaData/dateTime", "derive": "dateTime",
+#       "inputs": [ "*/YEAR", "*/MNTH", "*/DAYS", "*/HOUR", "*/MINU", "*/SECO" ],
+#       "units": "seconds since 1970-01-01T00:00:00Z", "long_name": "Datetime" } ]
+#
+# A variable is either read with a BUFR query, with an optional r.get type
+# and a scale and offset applied to a copy, or derived with one of the
+# functions in DERIVED from its inputs (each a query string or a dict with
+# query/type/scale/offset). All other keys are written as attributes in the
+# order given, lists as float32 arrays. Optional keys:
+#   group_by   query whose dimensions all variables are grouped by
+#   bufr_file  input file name  (default {cycle_type}.t{hh}z.{data_type}.tm00.{data_format})
+#   ioda_file  output file name (default {cycle_type}.t{hh}z.{data_type}.tm00.{data_format}.api.nc)
+#   qc         drop locations before the superob and output:
+#     "qc": { "enabled": true,
+#       "required": [ "ObsValue/radialVelocity" ],
+#       "range": { "ObsValue/gateRange": [ 0, 230000 ] },
+#       "bounded_by": { "ObsValue/radialVelocity": "ObsValue/unfoldingVelocity" } }
+#     in that order, the locations where a required variable is masked,
+#     where a range variable is masked or outside [min, max], and where the
+#     absolute value of a variable exceeds its bound (unless the bound is
+#     masked). The number rejected by each criterion is logged.
+#   superob    average the locations in bins before writing:
+#     "superob": { "enabled": true,
+#       "bins": [ { "name": "MetaData/stationIdentification" },
+#                 { "name": "ObsValue/gateRange", "width": 5000 } ],
+#       "value": "ObsValue/radialVelocity",
+#       "mean": [ "ObsValue/gateRange" ],
+#       "count": { "name": "MetaData/superobCount", "long_name": "..." },
+#       "spread": { "name": "MetaData/radialVelocitySpread", "long_name": "..." } }
+#     A bin with a width is floor(value / width), one without is each
+#     distinct value. Locations with the value or a bin masked are left out.
+#     With "method": "mean" (the default) or "median", the value and the mean
+#     variables are the mean or median of their unmasked values in each bin
+#     and the others take the value of the first location of the bin; with
+#     "nearest" all variables take the value of the location nearest to the
+#     center of the bin. The count and spread (standard deviation, float32)
+#     of the value are written as the optional count and spread variables.
+#   grid       count the locations (lightning strikes) in the cells of a lat/lon
+#              mesh, or at the nearest points of a model grid, and time bins:
+#     "grid": { "enabled": true, "resolution": 0.1, "grid_file": "", "time_bin": 600,
+#       "count": { "name": "ObsValue/lightningStrikeCount", ... },
+#       "density": { "name": "ObsValue/flashDensity", "units": "km-2 min-1", ... },
+#       "amplitude": { "name": "ObsValue/totalAmplitudeOfLightningStrikes",
+#                      "input": "ObsValue/amplitudeOfLightningStrike", ... } }
+#     The mesh has the given resolution in degrees, unless grid_file names an
+#     FV3 grid spec or MPAS grid file (strikes farther from the grid than its
+#     spacing are left out). MetaData/latitude, longitude and dateTime (or the
+#     latitude, longitude and dateTime keys) become the cell center and the
+#     middle of the time bin (seconds), other variables are dropped. Count,
+#     density and the total absolute amplitude of each cell are written as
+#     the optional count, density and amplitude variables.
+#   split_by   superob and write the locations of each value of a variable
+#              (a radar station or volume) in a pool of worker processes:
+#     "split_by": { "enabled": true, "name": "MetaData/stationIdentification",
+#       "merge": false, "ioda_file": "{cycle_type}.t{hh}z.{data_type}.{split}.tm00.{data_format}.api.nc" }
+#     Each part is written to its own file, or with merge the parts are
+#     assembled into the one output file. The number of workers is the
+#     "workers" key or -j (default the number of CPUs).
+#
+# Every query is decoded once, however many variables use it. Given several
+# configurations, those reading the same BUFR file with the same subsets
+# share one decode of the file (single-pass extraction). With --compare
+# each of them is also decoded on its own and the decode time saved is
+# reported.
+#
+# usage:
+#       bufr2ioda_engine.py -c config.json [config.json ...] [--compare] [-j workers] [-v]
+# ====================================================================
+
+import sys
+import argparse
+import collections
+import concurrent.futures
+import numpy as np
+import numpy.ma as ma
+import json
+import time
+import traceback
+import re
+import calendar
+import os
+from datetime import datetime
+from pyioda import ioda_obs_space as ioda_ospace
+from wxflow import Logger
+from pyiodaconv import bufr
+from bufr2ioda_utils import Mask_typ_for_var, Compute_dateTime, Compute_dateTime_from_fields
+from bufr2ioda_utils import Compute_WindComponents_from_WindDirection_and_WindSpeed
+from bufr2ioda_utils import Bin_index, Superob_groups, Superob_mean, Superob_median, Superob_nearest
+from bufr2ioda_utils import Latlon_mesh_cells, Latlon_mesh_centers, Model_grid_cells
+import warnings
+# suppress warnings
+warnings.filterwarnings('ignore')
+
+
+class ConversionError(Exception):
+    """
+    Raised by bufr_to_ioda_multi once all the other configurations are
+    converted, with the indices of the configurations that failed.
+    """
+
+    def __init__(self, failed):
+        super().__init__(f"Conversion failed for {len(failed)} configuration(s)")
+        self.failed = failed
+
+# Fill value of float32 variables that have no r.get fill value to keep
+FLOAT32_FILL_VALUE = np.float32(3.4028235e+38)
+
+# Keys of a variable that are not written as attributes
+CONTROL_KEYS = ('name', 'query', 'type', 'scale', 'offset', 'derive', 'inputs', 'input')
+
+
+def wind_components(cycleTimeSinceEpoch, wdir, wspd):
+    """
+    Eastward and northward wind from the wind direction and speed.
+    """
+
+    return Compute_WindComponents_from_WindDirection_and_WindSpeed(wdir, wspd)
+
+
+# Derived variables: function of (cycle time since epoch, *inputs), or
+# (function, index) for one of the variables a function returns, which is
+# called once for all the variables derived from it with the same inputs
+DERIVED = {
+    'dateTime': lambda cycleTimeSinceEpoch, *fields: Compute_dateTime_from_fields(*fields),
+    'dateTimeFromOffset': lambda cycleTimeSinceEpoch, dhr: Compute_dateTime(cycleTimeSinceEpoch, dhr),
+    'windEastward': (wind_components, 0),
+    'windNorthward': (wind_components, 1),
+    'obsType': lambda cycleTimeSinceEpoch, typ, var: Mask_typ_for_var(typ, var),
+}
+
+
+def field_spec(spec):
+    """
+    (query, type, scale, offset) of a query string or dict.
+    """
+
+    if isinstance(spec, str):
+        return (spec, None, None, None)
+    return (spec['query'], spec.get('type'), spec.get('scale'), spec.get('offset'))
+
+
+def variable_fields(variables):
+    """
+    Distinct fields read by the variables, in order of first use.
+    """
+
+    fields = []
+    for var in variables:
+        specs = var['inputs'] if 'derive' in var else [var]
+        for spec in specs:
+            field = field_spec(spec)
+            if field not in fields:
+                fields.append(field)
+    return fields
+
+
+def query_names(queries):
+    """
+    QuerySet names for the query strings: the last mnemonic of each, made
+    unique with a suffix.
+    """
+
+    names = {}
+    for query in queries:
+        base = re.findall(r'\w+', query)[-1]
+        name = base
+        n = 0
+        while name in names.values():
+            n += 1
+            name = f'{base}_{n}'
+        names[query] = name
+    return names
+
+
+def make_queryset(subsets, queries):
+
+    q = bufr.QuerySet(subsets)
+    names = query_names(queries)
+    for query, name in names.items():
+        q.add(name, query)
+    return q, names
+
+
+def get_fields(r, fields, names, group_by=None):
+    """
+    Numpy arrays of the fields from the ResultSet, with scale and offset
+    applied to a copy in the dtype that r.get returned.
+    """
+
+    data = {}
+    for field in fields:
+        query, dtype, scale, offset = field
+        args = [names[query]] + ([names[group_by]] if group_by else [])
+        value = r.get(*args, type=dtype) if dtype else r.get(*args)
+        if scale is not None or offset is not None:
+            # Other fields of the same query may share the array r.get returned
+            value = value.copy()
+            if scale is not None:
+                value *= scale
+            if offset is not None:
+                value += offset
+        data[field] = value
+    return data
+
+
+def derive_variables(variables, data, cycleTimeSinceEpoch):
+
+    values = {}
+    shared = {}
+    for var in variables:
+        if 'derive' in var:
+            fields = tuple(field_spec(spec) for spec in var['inputs'])
+            inputs = [data[field] for field in fields]
+            derive = DERIVED[var['derive']]
+            if isinstance(derive, tuple):
+                func, index = derive
+                if (func, fields) not in shared:
+                    shared[(func, fields)] = func(cycleTimeSinceEpoch, *inputs)
+                values[var['name']] = shared[(func, fields)][index]
+            else:
+                values[var['name']] = derive(cycleTimeSinceEpoch, *inputs)
+        else:
+            values[var['name']] = data[field_spec(var)]
+
+    # Variables with the same array (the same field) each get their own
+    seen = set()
+    for name, value in values.items():
+        if id(value) in seen:
+            values[name] = value.copy()
+        seen.add(id(value))
+    return values
+
+
+def write_variables(obsspace, variables, values):
+
+    for var in variables:
+        value = values[var['name']]
+        ioda_var = obsspace.create_var(var['name'], dtype=value.dtype, fillval=value.fill_value)
+        for key, attr in var.items():
+            if key in CONTROL_KEYS:
+                continue
+            if isinstance(attr, list):
+                attr = np.array(attr, dtype=np.float32)
+            ioda_var.write_attr(key, attr)
+        ioda_var.write_data(value)
+
+
+def qc_variables(qc, values):
+    """
+    Values of the variables at the locations passing the qc configuration,
+    and the number of locations rejected by each criterion, in order.
+    """
+
+    keep = np.ones(len(next(iter(values.values()))), dtype=bool)
+    rejected = {}
+    for name in qc.get('required', []):
+        reject = keep & ma.getmaskarray(values[name])
+        rejected[f'{name} missing'] = int(np.count_nonzero(reject))
+        keep &= ~reject
+    for name, (vmin, vmax) in qc.get('range', {}).items():
+        var = values[name]
+        inside = ~ma.getmaskarray(var) & (ma.getdata(var) >= vmin) & (ma.getdata(var) <= vmax)
+        reject = keep & ~inside
+        rejected[f'{name} outside [{vmin}, {vmax}]'] = int(np.count_nonzero(reject))
+        keep &= ~reject
+    for name, bound_name in qc.get('bounded_by', {}).items():
+        var, bound = values[name], values[bound_name]
+        exceeds = ~ma.getmaskarray(var) & ~ma.getmaskarray(bound) & (np.abs(ma.getdata(var)) > ma.getdata(bound))
+        reject = keep & exceeds
+        rejected[f'|{name}| > {bound_name}'] = int(np.count_nonzero(reject))
+        keep &= ~reject
+
+    return {name: var[keep] for name, var in values.items()}, rejected
+
+
+def superob_variables(superob, values):
+    """
+    Values of the variables in the bins of the superob configuration (mean,
+    median or nearest to the center), with the count and spread variables
+    added, and a summary of the numbers of locations and data sizes before
+    and after.
+    """
+
+    bin_vars = [values[spec['name']] for spec in superob['bins']]
+    value = values[superob['value']]
+    keep = ~ma.getmaskarray(value)
+    for var in bin_vars:
+        keep &= ~ma.getmaskarray(var)
+    keep = np.flatnonzero(keep)
+    bins = [Bin_index(var[keep], spec.get('width')) for var, spec in zip(bin_vars, superob['bins'])]
+    order, starts = Superob_groups(bins)
+    order = keep[order]
+
+    # Location representing each superob for the variables not averaged
+    method = superob.get('method', 'mean')
+    if method == 'nearest':
+        distance = np.zeros(len(value))
+        for var, spec in zip(bin_vars, superob['bins']):
+            if spec.get('width'):
+                position = ma.getdata(var).astype(np.float64) / spec['width']
+                distance += (position - np.floor(position) - 0.5)**2
+        representative = Superob_nearest(distance, order, starts)
+    else:
+        representative = order[starts]
+
+    superobs = {}
+    for name, var in values.items():
+        if name == superob['value']:
+            mean, value_count, value_spread = Superob_mean(var, order, starts)
+        if method == 'nearest' or not (name == superob['value'] or name in superob.get('mean', [])):
+            superobs[name] = var[representative]
+            continue
+        if method == 'median':
+            mean = Superob_median(var, order, starts)
+        elif name != superob['value']:
+            mean = Superob_mean(var, order, starts)[0]
+        if np.issubdtype(var.dtype, np.integer):
+            mean = np.rint(mean)
+        superobs[name] = ma.array(mean.astype(var.dtype), mask=ma.getmaskarray(mean), fill_value=var.fill_value)
+    if 'count' in superob:
+        superobs[superob['count']['name']] = ma.array(value_count.astype(np.int32), fill_value=np.int32(0))
+    if 'spread' in superob:
+        # float32 whatever the value dtype, so the spread of integer values is not truncated
+        spread_fill_value = value.fill_value if np.issubdtype(value.dtype, np.floating) else FLOAT32_FILL_VALUE
+        superobs[superob['spread']['name']] = ma.array(value_spread.astype(np.float32), mask=ma.getmaskarray(value_spread),
+                                                       fill_value=np.float32(spread_fill_value))
+
+    summary = {'locations': len(value), 'superobs': len(starts), 'left out': len(value) - len(order),
+               'size': sum(var.nbytes for var in values.values()), 'superob size': sum(var.nbytes for var in superobs.values())}
+    return superobs, summary
+
+
+def grid_variables(grid, values):
+    """
+    Count, density and total absolute amplitude of the strikes in each cell
+    of the mesh of the grid configuration and time bin, located at the cell
+    center and the middle of the time bin, and a summary as superob_variables
+    gives.
+    """
+
+    lat_name = grid.get('latitude', 'MetaData/latitude')
+    lon_name = grid.get('longitude', 'MetaData/longitude')
+    time_name = grid.get('dateTime', 'MetaData/dateTime')
+    lat, lon, dateTime = values[lat_name], values[lon_name], values[time_name]
+    time_bin = grid.get('time_bin', 3600)
+    keep = ~(ma.getmaskarray(lat) | ma.getmaskarray(lon) | ma.getmaskarray(dateTime))
+
+    if grid.get('grid_file'):
+        cell, grid_lat, grid_lon, grid_area = Model_grid_cells(grid['grid_file'], lat, lon)
+        keep &= cell >= 0
+    else:
+        cell = Latlon_mesh_cells(lat, lon, grid['resolution'])
+    time_index = np.floor_divide(ma.getdata(dateTime), time_bin)
+    keep = np.flatnonzero(keep)
+    order, starts = Superob_groups([cell[keep], time_index[keep]])
+    order = keep[order]
+    count = np.diff(np.append(starts, len(order)))
+
+    cells = cell[order[starts]]
+    if grid.get('grid_file'):
+        cell_lat, cell_lon, cell_area = grid_lat[cells], grid_lon[cells], grid_area[cells]
+    else:
+        cell_lat, cell_lon, cell_area = Latlon_mesh_centers(cells, grid['resolution'])
+
+    gridded = {
+        lat_name: ma.array(cell_lat.astype(lat.dtype), fill_value=lat.fill_value),
+        lon_name: ma.array(cell_lon.astype(lon.dtype), fill_value=lon.fill_value),
+        time_name: ma.array(time_index[order[starts]] * time_bin + time_bin // 2, fill_value=dateTime.fill_value),
+    }
+    if 'count' in grid:
+        gridded[grid['count']['name']] = ma.array(count.astype(np.int32), fill_value=np.int32(0))
+    if 'density' in grid:
+        # strikes per km2 per minute
+        gridded[grid['density']['name']] = ma.array((count / cell_area / (time_bin / 60.)).astype(np.float32),
+                                                    fill_value=np.float32(0))
+    if 'amplitude' in grid:
+        amplitude = values[grid['amplitude']['input']]
+        strength = np.where(ma.getmaskarray(amplitude), 0, np.abs(ma.getdata(amplitude)))[order].astype(np.float64)
+        gridded[grid['amplitude']['name']] = ma.array(np.add.reduceat(strength, starts).astype(np.float32),
+                                                      fill_value=np.float32(0))
+
+    summary = {'locations': len(lat), 'superobs': len(starts), 'left out': len(lat) - len(order),
+               'size': sum(var.nbytes for var in values.values()), 'superob size': sum(var.nbytes for var in gridded.values())}
+    return gridded, summary
+
+
+def superob_summary(summary):
+
+    return (f"{summary['locations']} locations in {summary['superobs']} bins ({summary['left out']} left out), "
+            f"data size {summary['size'] / 1e6:.1f} MB -> {summary['superob size'] / 1e6:.1f} MB")
+
+
+def output_values(config, variables, values):
+    """
+    Superob or grid the values when the configuration asks for it. Return
+    the variables and values to write, the superob or grid summary (None
+    without either) and the running times.
+    """
+
+    timings = {}
+    summary = None
+    superob = config.get("superob", {})
+    if superob and superob.get("enabled", True):
+        start_time = time.time()
+        values, summary = superob_variables(superob, values)
+        variables = variables + [superob[key] for key in ('count', 'spread') if key in superob]
+        timings['superob'] = time.time() - start_time
+
+    grid = config.get("grid", {})
+    if grid and grid.get("enabled", True):
+        start_time = time.time()
+        values, summary = grid_variables(grid, values)
+        variables = [var for var in variables if var['name'] in values]
+        variables = variables + [grid[key] for key in ('count', 'density', 'amplitude') if key in grid]
+        timings['grid'] = time.time() - start_time
+
+    return variables, values, summary, timings
+
+
+def write_values(config, variables, values, OUTPUT_PATH):
+    """
+    output_values written to OUTPUT_PATH. This runs in a worker process for
+    each part of a split output, so only the summary and the running times
+    are returned.
+    """
+
+    variables, values, summary, timings = output_values(config, variables, values)
+
+    start_time = time.time()
+    write_obsspace(config, variables, values, OUTPUT_PATH)
+    timings['output IODA'] = time.time() - start_time
+
+    return summary, timings
+
+
+def write_obsspace(config, variables, values, OUTPUT_PATH):
+
+    bufrfile = file_names(config)[0]
+
+    # Create the dimensions
+    dims = {'Location': np.arange(0, values[variables[0]['name']].shape[0])}
+
+    # Create IODA ObsSpace
+    obsspace = ioda_ospace.ObsSpace(OUTPUT_PATH, mode='w', dim_dict=dims)
+
+    # Create Global attributes
+    obsspace.write_attr('sourceFiles', bufrfile)
+    obsspace.write_attr('description', config["data_description"])
+
+    # Create IODA variables
+    write_variables(obsspace, variables, values)
+
+
+def map_workers(func, args_iter, workers):
+    """
+    func applied to each tuple of arguments from args_iter by a pool of worker
+    processes, or in this process with one worker; the results are yielded in
+    order. At most workers tuples are pending, plus the next one taken from
+    args_iter, so a generator of large arguments is not held all at once.
+    """
+
+    if workers <= 1:
+        for args in args_iter:
+            yield func(*args)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for args in args_iter:
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(func, *args))
+        while pending:
+            yield pending.popleft().result()
+
+
+def file_names(config, split=None):
+    """
+    Input and output file names and the cycle time of the configuration,
+    the output file name of the given part of a split output.
+    """
+
+    cycle = config["cycle_datetime"]
+    names = dict(cycle_type=config["cycle_type"], hh=cycle[8:10],
+                 data_type=config["data_type"], data_format=config["data_format"])
+    bufrfile = config.get("bufr_file", "{cycle_type}.t{hh}z.{data_type}.tm00.{data_format}").format(**names)
+    if split is None:
+        iodafile = config.get("ioda_file", "{cycle_type}.t{hh}z.{data_type}.tm00.{data_format}.api.nc").format(**names)
+    else:
+        iodafile = config["split_by"].get("ioda_file", "{cycle_type}.t{hh}z.{data_type}.{split}.tm00.{data_format}.api.nc")
+        iodafile = iodafile.format(split=split, **names)
+    reference_time = datetime.strptime(cycle, "%Y%m%d%H")
+    return bufrfile, iodafile, reference_time
+
+
+def execute_queryset(DATA_PATH, subsets, queries, logger):
+    """
+    Decode the BUFR file once for all queries; return the ResultSet (None on
+    failure), the QuerySet names of the queries and the running times.
+    """
+
+    timings = {}
+
+    # ============================================
+    # Make the QuerySet for all the data we want
+    # ============================================
+    start_time = time.time()
+
+    logger.info('Making QuerySet')
+    q, query_name = make_queryset(subsets, queries)
+
+    timings['making QuerySet'] = time.time() - start_time
+    logger.debug(f"Running time for making QuerySet : {timings['making QuerySet']} seconds")
+
+    # ==============================================================
+    # Open the BUFR file and execute the QuerySet to get ResultSet
+    # ==============================================================
+    start_time = time.time()
+
+    logger.info('Executing QuerySet to get ResultSet')
+    with bufr.File(DATA_PATH) as f:
+        try:
+            r = f.execute(q)
+        except Exception as err:
+            logger.info(f'Return with {err}')
+            return None, query_name, timings
+
+    timings['executing QuerySet'] = time.time() - start_time
+    logger.info(f"Running time for executing QuerySet : {timings['executing QuerySet']} seconds")
+
+    return r, query_name, timings
+
+
+def config_queries(config):
+    """
+    Fields read by the configuration and the queries they need.
+    """
+
+    fields = variable_fields(config["variables"])
+    group_by = config.get("group_by")
+    queries = [field[0] for field in fields] + ([group_by] if group_by else [])
+    return fields, queries
+
+
+def write_ioda(config, r, query_name, fields, timings, logger):
+    """
+    Get, derive and write the IODA variables of the configuration from the
+    ResultSet, adding the running times to timings.
+    """
+
+    bufrfile, iodafile, reference_time = file_names(config)
+    cycleTimeSinceEpoch = np.int64(calendar.timegm(reference_time.timetuple()))
+    variables = config["variables"]
+
+    # ===============================================
+    # Use the ResultSet to get numpy arrays of data
+    # ===============================================
+    start_time = time.time()
+
+    data = get_fields(r, fields, query_name, config.get("group_by"))
+    for (query, dtype, scale, offset), value in data.items():
+        logger.debug(f"     {query:<40} shape = {value.shape}, type = {value.dtype}")
+
+    logger.info('Executing QuerySet Done!')
+    timings['getting ResultSet'] = time.time() - start_time
+    logger.info(f"Running time for getting ResultSet : {timings['getting ResultSet']} seconds")
+
+    # =========================
+    # Create derived variables
+    # =========================
+    start_time = time.time()
+
+    logger.info('Creating derived variables')
+    values = derive_variables(variables, data, cycleTimeSinceEpoch)
+
+    timings['creating derived variables'] = time.time() - start_time
+    logger.info(f"Running time for creating derived variables : {timings['creating derived variables']} seconds")
+
+    # =========================
+    # Pre-QC
+    # =========================
+    qc = config.get("qc", {})
+    if qc and qc.get("enabled", True):
+        start_time = time.time()
+
+        logger.info('Applying pre-QC')
+        nlocs = len(values[variables[0]['name']])
+        values, rejected = qc_variables(qc, values)
+        for criterion, count in rejected.items():
+            logger.info(f"     rejected {count:>10} {criterion}")
+        logger.info(f"Pre-QC kept {len(values[variables[0]['name']])} of {nlocs} locations")
+
+        timings['pre-QC'] = time.time() - start_time
+        logger.info(f"Running time for pre-QC : {timings['pre-QC']} seconds")
+
+    split = config.get("split_by", {})
+    if split and split.get("enabled", True):
+        write_split(config, variables, values, timings, logger)
+    else:
+        # =====================================
+        # Superob
+        # Create IODA ObsSpace
+        # Write IODA output
+        # =====================================
+        OUTPUT_PATH = os.path.join(config["ioda_directory"], iodafile)
+        logger.info(f"Create output file: {OUTPUT_PATH}")
+        summary, output_timings = write_values(config, variables, values, OUTPUT_PATH)
+        if summary is not None:
+            logger.info(f"{'Grid cells' if 'grid' in output_timings else 'Superobs'}: {superob_summary(summary)}")
+        for stage in ('superob', 'grid'):
+            if stage in output_timings:
+                logger.info(f"Running time for {stage} : {output_timings[stage]} seconds")
+        logger.info(f"Running time for output IODA: {output_timings['output IODA']} seconds")
+        if os.path.isfile(OUTPUT_PATH):
+            logger.info(f"Output file size: {os.path.getsize(OUTPUT_PATH) / 1e6:.1f} MB")
+        timings.update(output_timings)
+
+    logger.info(f"Running time per stage for {config['data_type']}: " +
+                ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in timings.items()))
+    return timings
+
+
+def write_split(config, variables, values, timings, logger):
+    """
+    Split the locations by the split_by variable (a radar station or volume)
+    and superob and write each part in a pool of worker processes, to a file
+    per part or, with merge, to one file assembled from the parts.
+    """
+
+    start_time = time.time()
+
+    split = config["split_by"]
+    key = values[split['name']]
+    keep = np.flatnonzero(~ma.getmaskarray(key))
+    order, starts = Superob_groups([Bin_index(key[keep])])
+    order = keep[order]
+    ends = np.append(starts[1:], len(order)).astype(int)
+
+    parts = []
+    for start, end in zip(starts, ends):
+        split_key = str(key[order[start]]).strip()
+        OUTPUT_PATH = None if split.get("merge") else os.path.join(config["ioda_directory"], file_names(config, split_key)[1])
+        parts.append((split_key, start, end, OUTPUT_PATH))
+
+    def part_args():
+        # The values of a part are sliced only when it is submitted
+        for split_key, start, end, OUTPUT_PATH in parts:
+            rows = order[start:end]
+            part_values = {name: var[rows] for name, var in values.items()}
+            yield (config, variables, part_values) + ((OUTPUT_PATH,) if OUTPUT_PATH is not None else ())
+
+    workers = max(min(config.get("workers", os.cpu_count()), len(parts)), 1)
+    logger.info(f"Split {len(key)} locations by {split['name']} into {len(parts)} parts "
+                f"({len(key) - len(order)} left out) with {workers} workers")
+
+    merged_parts = []
+    results = map_workers(output_values if split.get("merge") else write_values, part_args(), workers)
+    for (split_key, start, end, OUTPUT_PATH), result in zip(parts, results):
+        if OUTPUT_PATH is None:
+            part_variables, part_values, summary, part_timings = result
+            merged_parts.append((part_variables, part_values))
+        else:
+            summary, part_timings = result
+        logger.info(f"Running time for {split_key}: " + ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in part_timings.items()) +
+                    (f"; superobs: {superob_summary(summary)}" if summary is not None else f"; {end - start} locations"))
+        if OUTPUT_PATH is not None:
+            logger.debug(f"Created output file: {OUTPUT_PATH}")
+
+    timings['split output'] = time.time() - start_time
+    logger.info(f"Running time for split output: {timings['split output']} seconds")
+
+    if merged_parts:
+        start_time = time.time()
+
+        part_variables = merged_parts[0][0]
+        merged = {}
+        for var in part_variables:
+            var_parts = [part_values[var['name']] for _, part_values in merged_parts]
+            merged[var['name']] = ma.array(ma.concatenate(var_parts), fill_value=var_parts[0].fill_value)
+        OUTPUT_PATH = os.path.join(config["ioda_directory"], file_names(config)[1])
+        logger.info(f"Create output file: {OUTPUT_PATH}")
+        write_obsspace(config, part_variables, merged, OUTPUT_PATH)
+
+        timings['output IODA'] = time.time() - start_time
+        logger.info(f"Running time for output IODA: {timings['output IODA']} seconds")
+        if os.path.isfile(OUTPUT_PATH):
+            logger.info(f"Output file size: {os.path.getsize(OUTPUT_PATH) / 1e6:.1f} MB")
+
+
+def bufr_to_ioda(config, logger):
+    """
+    Convert the BUFR file of the configuration to IODA; return the running
+    time of each stage in seconds, or None if there is no output.
+    """
+
+    return bufr_to_ioda_multi([config], logger)[0]
+
+
+def bufr_to_ioda_multi(configs, logger, compare=False):
+    """
+    Convert several configurations, decoding each BUFR file once for all
+    configurations that read it with the same subsets: their queries go into
+    one QuerySet and the ResultSet is shared by their IODA writers. (Rows of
+    a ResultSet cannot be told apart by subset, so configurations with other
+    subsets get their own decode.) With compare, each configuration sharing
+    a decode is also decoded on its own to measure the time saved, at the
+    cost of those extra decodes. Return the running times of each
+    configuration as bufr_to_ioda does. A configuration that fails does not
+    stop the others; ConversionError is raised at the end if any failed.
+    """
+
+    all_timings = [None] * len(configs)
+    failed = []
+
+    # Group the configurations by BUFR file and subsets
+    groups = {}
+    for i, config in enumerate(configs):
+        logger.debug(f"Checking subsets = {config['subsets']}")
+        bufrfile, iodafile, reference_time = file_names(config)
+        logger.info(f"reference_time = {reference_time.strftime('%Y-%m-%dT%H:%M:%SZ')}")
+        DATA_PATH = os.path.join(config["dump_directory"], bufrfile)
+        if not os.path.isfile(DATA_PATH):
+            logger.info(f"DATA_PATH {DATA_PATH} does not exist")
+            continue
+        logger.debug(f"The DATA_PATH is: {DATA_PATH}")
+        groups.setdefault((DATA_PATH, tuple(config["subsets"])), []).append(i)
+
+    decode_time = 0.
+    saved_time = 0.
+    for (DATA_PATH, subsets), members in groups.items():
+        fields = {}
+        queries = []
+        for i in members:
+            fields[i], config_query = config_queries(configs[i])
+            queries += config_query
+        queries = list(dict.fromkeys(queries))
+        data_types = [configs[i]["data_type"] for i in members]
+        if len(members) > 1:
+            logger.info(f"Decoding {DATA_PATH} once for {', '.join(data_types)}")
+
+        try:
+            r, query_name, timings = execute_queryset(DATA_PATH, list(subsets), queries, logger)
+        except Exception:
+            logger.error(f"Decoding {DATA_PATH} failed for {', '.join(data_types)}:\n{traceback.format_exc()}")
+            failed += members
+            continue
+        if r is None:
+            continue
+        decode_time += timings['executing QuerySet']
+
+        if len(members) > 1 and compare:
+            separate_time = 0.
+            for i in members:
+                separate_time += execute_queryset(DATA_PATH, list(subsets), config_queries(configs[i])[1], logger)[2]['executing QuerySet']
+            saved = separate_time - timings['executing QuerySet']
+            logger.info(f"Decode time saved for {DATA_PATH}: {saved:.3f} seconds "
+                        f"({separate_time:.3f} s separately, {timings['executing QuerySet']:.3f} s once)")
+            saved_time += saved
+
+        for i in members:
+            try:
+                all_timings[i] = write_ioda(configs[i], r, query_name, fields[i], dict(timings), logger)
+            except Exception:
+                logger.error(f"Conversion of {configs[i]['data_type']} failed:\n{traceback.format_exc()}")
+                failed.append(i)
+
+    if len(configs) > 1:
+        logger.info(f"Decoded {len(groups)} BUFR files for {len(configs)} configurations in {decode_time:.3f} seconds" +
+                    (f"; decode time saved by single-pass extraction: {saved_time:.3f} seconds" if compare else ""))
+    if failed:
+        raise ConversionError(sorted(failed))
+    logger.info("All Done!")
+
+    return all_timings
+
+
+def main(obtype=None):
+
+    start_time = time.time()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--config', type=str, nargs='+', required=True,
+                        help='Input JSON configuration(s); configurations reading the same BUFR file share one decode')
+    parser.add_argument('--compare', action='store_true',
+                        help='also decode each configuration sharing a decode separately to measure the decode time saved')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='number of processes writing the parts of a split output')
+    parser.add_argument('-v', '--verbose', help='print debug logging information',
+                        action='store_true')
+    args = parser.parse_args()
+
+    configs = []
+    for config_file in args.config:
+        with open(config_file, "r") as json_file:
+            configs.append(json.load(json_file))
+        if args.workers is not None:
+            configs[-1]["workers"] = args.workers
+
+    log_level = 'DEBUG' if args.verbose else 'INFO'
+    logger = Logger(f'BUFR2IODA_{obtype or "_".join(config["data_type"] for config in configs)}.py',
+                    level=log_level, colored_log=True)
+
+    status = 0
+    try:
+        bufr_to_ioda_multi(configs, logger, compare=args.compare)
+    except ConversionError as error:
+        for i in error.failed:
+            logger.error(f"Conversion failed for {args.config[i]}")
+        status = 1
+
+    end_time = time.time()
+    running_time = end_time - start_time
+    logger.info(f"Total running time: {running_time} seconds")
+
+    return status
+
+
+if __name__ == '__main__':
+
+    sys.exit(main())
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import argparse
 import calendar
+import collections
+import concurrent.futures
 import datetime
 import json
 import math
@@ -220,318 +222,403 @@ def bufr_to_ioda(config, logger):
     # Write IODA output
     # =====================================
     logger.info("Create IODA ObsSpace and Write IODA output based on satellite ID")
+    start_time = time.time()
 
     # Find nique satellite identifiers in data to process
     unique_satids = np.unique(satid)
     logger.info(f"Number of Unique satellite identifiers: {len(unique_satids)}")
     logger.info(f"Unique satellite identifiers: {unique_satids}")
+
+    # Group the rows with 0 < satzenang < 80 by satellite identifier in a single pass:
+    # a stable argsort by satid keeps the original order of the rows of each satellite
+    satzenang_mask = np.asarray(np.logical_and(0 < satzenang, satzenang < 80))
+    rows = np.flatnonzero(satzenang_mask & ~ma.getmaskarray(satid))
+    rows = rows[np.argsort(satid.data[rows], kind="stable")]
+    group_satids, group_start, group_count = np.unique(
+        satid.data[rows], return_index=True, return_counts=True
+    )
+    satid_rows = {
+        sat: rows[start:start + count]
+        for sat, start, count in zip(group_satids.tolist(), group_start, group_count)
+    }
+    satellite_info_dict = {
+        satellite_info["satellite_id"]: satellite_info
+        for satellite_info in satellite_info_array
+    }
+
     logger.debug(f"Loop through unique satellite identifier {unique_satids}")
-    total_ob_processed = 0
+    tasks = []
     for sat in unique_satids.tolist():
-        start_time = time.time()
-
-        matched = False
-        for satellite_info in satellite_info_array:
-            if satellite_info["satellite_id"] == sat:
-                matched = True
-                satellite_id = satellite_info["satellite_id"]
-                satellite_name = satellite_info["satellite_name"]
-                satinst = sensor_name.lower() + "_" + satellite_name.lower()
-                logger.debug(f"Split data for {satinst} satid = {sat}")
-
-        if matched:
-            if satellite_id in wavenum_values_dict:
-                # Extract the wavenum values for the current satellite ID
-                Wavenum = wavenum_values_dict[satellite_id]
-            else:
-                # If the satellite ID is not in the dictionary
-                logger.debug(f"satellite ID is not in the dictionary {satellite_id}")
-
-            # Define a boolean mask to subset data from the original data object
-            satelite_mask = satid == sat
-            # Define a boolean mask based on the condition 0 < satzenang2 < 80
-            satzenang_mask = np.logical_and(0 < satzenang, satzenang < 80)
-            combined_mask = satzenang_mask & satelite_mask
-            # MetaData
-            lon2 = lon[combined_mask]
-            lat2 = lat[combined_mask]
-            timestamp2 = timestamp[combined_mask]
-            satid2 = satid[combined_mask]
-            instid2 = instid[combined_mask]
-            satzenang2 = satzenang[combined_mask]
-            chanfreq2 = chanfreq[6:16]
-            scanpos2 = scanpos[combined_mask]
-            solzenang2 = solzenang[combined_mask]
-            cldFree2 = cldFree[combined_mask]
-            cloudAmount2 = cloudAmount[combined_mask]
-            BT2 = BT[combined_mask]
-            clrStdDev2 = clrStdDev[combined_mask]
-            viewang2 = viewang.flatten()[combined_mask]
-            sataziang2 = sataziang.flatten()[combined_mask]
-            solaziang2 = solaziang.flatten()[combined_mask]
-
-            # Timestamp Range
-            timestamp2_min = datetime.fromtimestamp(timestamp2.min())
-            timestamp2_max = datetime.fromtimestamp(timestamp2.max())
-
-            # Check unique observation time
-            unique_timestamp2 = np.unique(timestamp2)
-            logger.debug(f"Processing output for satid {sat}")
-            logger.info(f"number of unique_timestamp2 {len(unique_timestamp2)}")
-            logger.info(f"unique_timestamp2 {unique_timestamp2}")
-
-            # Create the dimensions
-            dims = {
-                "Location": np.arange(0, BT2.shape[0]),
-                "Channel": np.arange(channel_start, channel_end + 1),
-            }
-
-            # Create IODA ObsSpace
-            iodafile = f"{cycle_type}.t{hh}z.{satinst}.tm00.nc"
-            OUTPUT_PATH = os.path.join(ioda_dir, iodafile)
-            logger.info(f"Create output file : {OUTPUT_PATH}")
-            obsspace = ioda_ospace.ObsSpace(OUTPUT_PATH, mode="w", dim_dict=dims)
-
-            # Create Global attributes
-            logger.debug("Write global attributes")
-            obsspace.write_attr("Converter", converter)
-            obsspace.write_attr("sourceFiles", bufrfile)
-            obsspace.write_attr("description", data_description)
-            obsspace.write_attr("datetimeReference", reference_time)
-            obsspace.write_attr(
-                "datetimeRange", [str(timestamp2_min), str(timestamp2_max)]
-            )
-            obsspace.write_attr("sensor", sensor_id)
-            obsspace.write_attr("platform", satellite_id)
-            obsspace.write_attr("platformCommonName", satellite_name)
-            obsspace.write_attr("sensorCommonName", sensor_name)
-            obsspace.write_attr("processingLevel", process_level)
-            obsspace.write_attr("platformLongDescription", platform_description)
-            obsspace.write_attr("sensorLongDescription", sensor_description)
-
-            # Create IODA variables
-            logger.debug("Write variables: name, type, units, and attributes")
-
-            # Sensor Channel Number
-            obsspace.create_var(
-                "MetaData/sensorChannelNumber",
-                dim_list=["Channel"],
-                dtype=np.int32,
-                fillval=int32_fill_value,
-            ).write_attr("long_name", "Sensor Channel Number").write_data(channum)
-
-            # Sensor Central Frequency
-            obsspace.create_var(
-                "MetaData/sensorCentralFrequency",
-                dim_list=["Channel"],
-                dtype=chanfreq2.dtype,
-                fillval=chanfreq2.fill_value,
-            ).write_attr("units", "Hz").write_attr(
-                "long_name", "Satellite Channel Center Frequency"
-            ).write_data(
-                chanfreq2
+        if sat not in satellite_info_dict:
+            logger.info(
+                f"Do not find this satellite id in the configuration: satid = {sat}"
             )
+            continue
 
-            # Sensor Central Wavenumber
-            obsspace.create_var(
-                "MetaData/sensorCentralWavenumber",
-                dim_list=["Channel"],
-                dtype=Wavenum.dtype,
-                fillval=wavenum_fill_value,
-            ).write_attr("units", "m-1").write_attr(
-                "long_name", "Sensor Central Wavenumber"
-            ).write_data(
-                Wavenum
-            )
+        satellite_id = satellite_info_dict[sat]["satellite_id"]
+        satellite_name = satellite_info_dict[sat]["satellite_name"]
+        satinst = sensor_name.lower() + "_" + satellite_name.lower()
+        logger.debug(f"Split data for {satinst} satid = {sat}")
+
+        if satellite_id in wavenum_values_dict:
+            # Extract the wavenum values for the current satellite ID
+            Wavenum = wavenum_values_dict[satellite_id]
+        else:
+            # If the satellite ID is not in the dictionary
+            logger.debug(f"satellite ID is not in the dictionary {satellite_id}")
+
+        index = satid_rows.get(sat, np.array([], dtype=np.intp))
+        attrs = {
+            "Converter": converter,
+            "sourceFiles": bufrfile,
+            "description": data_description,
+            "datetimeReference": reference_time,
+            "sensor": sensor_id,
+            "platform": satellite_id,
+            "platformCommonName": satellite_name,
+            "sensorCommonName": sensor_name,
+            "processingLevel": process_level,
+            "platformLongDescription": platform_description,
+            "sensorLongDescription": sensor_description,
+        }
+        channels = {
+            "sensorChannelNumber": channum,
+            "sensorCentralFrequency": chanfreq[6:16],
+            "sensorCentralWavenumber": Wavenum,
+        }
+        fill_values = {
+            "int32": int32_fill_value,
+            "int64": int64_fill_value,
+            "wavenum": wavenum_fill_value,
+        }
+
+        # Create IODA ObsSpace
+        iodafile = f"{cycle_type}.t{hh}z.{satinst}.tm00.nc"
+        OUTPUT_PATH = os.path.join(ioda_dir, iodafile)
+        tasks.append((satinst, OUTPUT_PATH, attrs, channels, fill_values, index))
+
+    def satellite_args():
+        # The data of a satellite is subset only when it is submitted
+        for satinst, OUTPUT_PATH, attrs, channels, fill_values, index in tasks:
+            # Subset data from the original data object
+            data = {
+                "longitude": lon[index],
+                "latitude": lat[index],
+                "dateTime": timestamp[index],
+                "satelliteIdentifier": satid[index],
+                "instrumentIdentifier": instid[index],
+                "sensorZenithAngle": satzenang[index],
+                "sensorScanPosition": scanpos[index],
+                "solarZenithAngle": solzenang[index],
+                "cloudFree": cldFree[index],
+                "cloudAmount": cloudAmount[index],
+                "brightnessTemperature": BT[index],
+                "ClearSkyStdDev": clrStdDev[index],
+                "sensorViewAngle": viewang.flatten()[index],
+                "sensorAzimuthAngle": sataziang.flatten()[index],
+                "solarAzimuthAngle": solaziang.flatten()[index],
+            }
+            yield OUTPUT_PATH, attrs, channels, fill_values, data
+
+    # Write the IODA file of each satellite in a pool of worker processes,
+    # with at most one pending satellite per worker
+    workers = min(config.get("workers", os.cpu_count()), len(tasks))
+    logger.info(f"Write {len(tasks)} IODA output files with {max(workers, 1)} workers")
+    if workers > 1:
+        results = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = collections.deque()
+            for args in satellite_args():
+                if len(pending) >= workers:
+                    results.append(pending.popleft().result())
+                pending.append(pool.submit(write_ioda_satellite, *args))
+            results.extend(future.result() for future in pending)
+    else:
+        results = [write_ioda_satellite(*args) for args in satellite_args()]
 
-            if np.any(combined_mask):
-                # Longitude
-                obsspace.create_var(
-                    "MetaData/longitude", dtype=lon2.dtype, fillval=lon2.fill_value
-                ).write_attr("units", "degrees_east").write_attr(
-                    "valid_range", np.array([-180, 180], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Longitude"
-                ).write_data(
-                    lon2
-                )
-
-                # Latitude
-                obsspace.create_var(
-                    "MetaData/latitude", dtype=lat2.dtype, fillval=lat2.fill_value
-                ).write_attr("units", "degrees_north").write_attr(
-                    "valid_range", np.array([-90, 90], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Latitude"
-                ).write_data(
-                    lat2
-                )
-
-                # Datetime
-                obsspace.create_var(
-                    "MetaData/dateTime", dtype=np.int64, fillval=int64_fill_value
-                ).write_attr("units", "seconds since 1970-01-01T00:00:00Z").write_attr(
-                    "long_name", "Datetime"
-                ).write_data(
-                    timestamp2
-                )
-
-                # Satellite Identifier
-                obsspace.create_var(
-                    "MetaData/satelliteIdentifier",
-                    dtype=satid2.dtype,
-                    fillval=satid2.fill_value,
-                ).write_attr("long_name", "Satellite Identifier").write_data(satid2)
-
-                # Instrument Identifier
-                obsspace.create_var(
-                    "MetaData/instrumentIdentifier",
-                    dtype=instid2.dtype,
-                    fillval=instid2.fill_value,
-                ).write_attr("long_name", "Satellite Instrument Identifier").write_data(
-                    instid2
-                )
-
-                # Scan Position (derived variable, need to specified fill value explicitly)
-                obsspace.create_var(
-                    "MetaData/sensorScanPosition",
-                    dtype=scanpos2.astype(np.int32).dtype,
-                    fillval=int32_fill_value,
-                ).write_attr("long_name", "Sensor Scan Position").write_data(scanpos2)
-
-                # Sensor Zenith Angle
-                obsspace.create_var(
-                    "MetaData/sensorZenithAngle",
-                    dtype=satzenang2.dtype,
-                    fillval=satzenang2.fill_value,
-                ).write_attr("units", "degree").write_attr(
-                    "valid_range", np.array([0, 90], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Sensor Zenith Angle"
-                ).write_data(
-                    satzenang2
-                )
-
-                # Sensor Azimuth Angle
-                obsspace.create_var(
-                    "MetaData/sensorAzimuthAngle",
-                    dtype=np.float32,
-                    fillval=sataziang2.fill_value,
-                ).write_attr("units", "degree").write_attr(
-                    "valid_range", np.array([0, 360], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Sensor Azimuth Angle"
-                ).write_data(
-                    sataziang2
-                )
-
-                # Solar Azimuth Angle
-                obsspace.create_var(
-                    "MetaData/solarAzimuthAngle",
-                    dtype=np.float32,
-                    fillval=solaziang2.fill_value,
-                ).write_attr("units", "degree").write_attr(
-                    "valid_range", np.array([0, 360], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Solar Azimuth Angle"
-                ).write_data(
-                    solaziang2
-                )
-
-                # Sensor View Angle
-                obsspace.create_var(
-                    "MetaData/sensorViewAngle",
-                    dtype=np.float32,
-                    fillval=viewang2.fill_value,
-                ).write_attr("units", "degree").write_attr(
-                    "long_name", "Sensor View Angle"
-                ).write_data(
-                    viewang2
-                )
-
-                # Solar Zenith Angle
-                obsspace.create_var(
-                    "MetaData/solarZenithAngle",
-                    dtype=solzenang2.dtype,
-                    fillval=solzenang2.fill_value,
-                ).write_attr("units", "degree").write_attr(
-                    "valid_range", np.array([0, 180], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Solar Zenith Angle"
-                ).write_data(
-                    solzenang2
-                )
-
-                # Cloud free
-                obsspace.create_var(
-                    "MetaData/cloudFree",
-                    dtype=cldFree2.dtype, fillval=int32_fill_value
-                ).write_attr("units", "1").write_attr(
-                    "valid_range", np.array([0, 100], dtype=np.int32)
-                ).write_attr(
-                    "long_name", "Amount Segment Cloud Free"
-                ).write_data(
-                    cldFree2
-                )
-
-                # Cloud amount based on computation
-                obsspace.create_var(
-                    "MetaData/cloudAmount",
-                    dtype=cloudAmount2.dtype,
-                    fillval=cloudAmount2.fill_value,
-                ).write_attr("units", "1").write_attr(
-                    "valid_range", np.array([0, 100], dtype=np.float32)
-                ).write_attr(
-                    "long_name", "Amount of cloud coverage in layer"
-                ).write_data(
-                    cloudAmount2
-                )
-
-                # ObsType based on computation method/spectral band
-                obsspace.create_var(
-                    "ObsValue/brightnessTemperature",
-                    dim_list=["Location", "Channel"],
-                    dtype=np.float32,
-                    fillval=BT2.fill_value,
-                ).write_attr("units", "k").write_attr(
-                    "long_name", "Brightness Temperature"
-                ).write_data(
-                    BT2
-                )
-
-                obsspace.create_var(
-                    "ClearSkyStdDev/brightnessTemperature",
-                    dim_list=["Location", "Channel"],
-                    dtype=np.float32,
-                    fillval=clrStdDev2.fill_value,
-                ).write_attr(
-                    "long_name", "Standard Deviation Brightness Temperature"
-                ).write_data(
-                    clrStdDev2
-                )
-
-            else:
-                logger.debug(
-                    "No valid values (0<satzenang2 < 80), skipping writing to IODA"
-                )
-
-            end_time = time.time()
-            running_time = end_time - start_time
-            total_ob_processed += len(satid2)
-            logger.debug(f"Number of observation processed : {len(satid2)}")
+    total_ob_processed = 0
+    for task, (nobs, unique_timestamp2, running_time) in zip(tasks, results):
+        satinst, OUTPUT_PATH = task[:2]
+        logger.info(f"Create output file : {OUTPUT_PATH}")
+        logger.info(f"number of unique_timestamp2 for {satinst} {len(unique_timestamp2)}")
+        logger.debug(f"unique_timestamp2 {unique_timestamp2}")
+        if nobs == 0:
             logger.debug(
-                f"Processing time for splitting and output IODA for {satinst} : {running_time} seconds"
+                "No valid values (0<satzenang2 < 80), skipping writing to IODA"
             )
+        total_ob_processed += nobs
+        logger.debug(f"Number of observation processed : {nobs}")
+        logger.info(
+            f"Processing time for output IODA for {satinst} : {running_time} seconds"
+        )
 
-        else:
-            logger.info(
-                f"Do not find this satellite id in the configuration: satid = {sat}"
-            )
+    end_time = time.time()
+    running_time = end_time - start_time
+    logger.info(
+        f"Processing time for splitting and output IODA : {running_time} seconds"
+    )
 
     logger.info("All Done!")
     logger.info(f"Total number of observation processed : {total_ob_processed}")
 
 
+def write_ioda_satellite(OUTPUT_PATH, attrs, channels, fill_values, data):
+    """
+    Write the IODA file of one satellite, this runs in a worker process.
+    Returns the number of observations, their unique times and the running time.
+    """
+    start_time = time.time()
+
+    int32_fill_value = fill_values["int32"]
+    int64_fill_value = fill_values["int64"]
+    channum = channels["sensorChannelNumber"]
+    chanfreq2 = channels["sensorCentralFrequency"]
+    Wavenum = channels["sensorCentralWavenumber"]
+    lon2 = data["longitude"]
+    lat2 = data["latitude"]
+    timestamp2 = data["dateTime"]
+    satid2 = data["satelliteIdentifier"]
+    instid2 = data["instrumentIdentifier"]
+    satzenang2 = data["sensorZenithAngle"]
+    scanpos2 = data["sensorScanPosition"]
+    solzenang2 = data["solarZenithAngle"]
+    cldFree2 = data["cloudFree"]
+    cloudAmount2 = data["cloudAmount"]
+    BT2 = data["brightnessTemperature"]
+    clrStdDev2 = data["ClearSkyStdDev"]
+    viewang2 = data["sensorViewAngle"]
+    sataziang2 = data["sensorAzimuthAngle"]
+    solaziang2 = data["solarAzimuthAngle"]
+
+    # Timestamp Range
+    timestamp2_min = datetime.fromtimestamp(timestamp2.min())
+    timestamp2_max = datetime.fromtimestamp(timestamp2.max())
+
+    # Check unique observation time
+    unique_timestamp2 = np.unique(timestamp2)
+
+    # Create the dimensions
+    dims = {
+        "Location": np.arange(0, BT2.shape[0]),
+        "Channel": channum,
+    }
+
+    # Create IODA ObsSpace
+    obsspace = ioda_ospace.ObsSpace(OUTPUT_PATH, mode="w", dim_dict=dims)
+
+    # Create Global attributes
+    for name, value in attrs.items():
+        obsspace.write_attr(name, value)
+        if name == "datetimeReference":
+            obsspace.write_attr(
+                "datetimeRange", [str(timestamp2_min), str(timestamp2_max)]
+            )
+
+    # Create IODA variables
+    # Sensor Channel Number
+    obsspace.create_var(
+        "MetaData/sensorChannelNumber",
+        dim_list=["Channel"],
+        dtype=np.int32,
+        fillval=int32_fill_value,
+    ).write_attr("long_name", "Sensor Channel Number").write_data(channum)
+
+    # Sensor Central Frequency
+    obsspace.create_var(
+        "MetaData/sensorCentralFrequency",
+        dim_list=["Channel"],
+        dtype=chanfreq2.dtype,
+        fillval=chanfreq2.fill_value,
+    ).write_attr("units", "Hz").write_attr(
+        "long_name", "Satellite Channel Center Frequency"
+    ).write_data(
+        chanfreq2
+    )
+
+    # Sensor Central Wavenumber
+    obsspace.create_var(
+        "MetaData/sensorCentralWavenumber",
+        dim_list=["Channel"],
+        dtype=Wavenum.dtype,
+        fillval=fill_values["wavenum"],
+    ).write_attr("units", "m-1").write_attr(
+        "long_name", "Sensor Central Wavenumber"
+    ).write_data(
+        Wavenum
+    )
+
+    if len(satid2) > 0:
+        # Longitude
+        obsspace.create_var(
+            "MetaData/longitude", dtype=lon2.dtype, fillval=lon2.fill_value
+        ).write_attr("units", "degrees_east").write_attr(
+            "valid_range", np.array([-180, 180], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Longitude"
+        ).write_data(
+            lon2
+        )
+
+        # Latitude
+        obsspace.create_var(
+            "MetaData/latitude", dtype=lat2.dtype, fillval=lat2.fill_value
+        ).write_attr("units", "degrees_north").write_attr(
+            "valid_range", np.array([-90, 90], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Latitude"
+        ).write_data(
+            lat2
+        )
+
+        # Datetime
+        obsspace.create_var(
+            "MetaData/dateTime", dtype=np.int64, fillval=int64_fill_value
+        ).write_attr("units", "seconds since 1970-01-01T00:00:00Z").write_attr(
+            "long_name", "Datetime"
+        ).write_data(
+            timestamp2
+        )
+
+        # Satellite Identifier
+        obsspace.create_var(
+            "MetaData/satelliteIdentifier",
+            dtype=satid2.dtype,
+            fillval=satid2.fill_value,
+        ).write_attr("long_name", "Satellite Identifier").write_data(satid2)
+
+        # Instrument Identifier
+        obsspace.create_var(
+            "MetaData/instrumentIdentifier",
+            dtype=instid2.dtype,
+            fillval=instid2.fill_value,
+        ).write_attr("long_name", "Satellite Instrument Identifier").write_data(
+            instid2
+        )
+
+        # Scan Position (derived variable, need to specified fill value explicitly)
+        obsspace.create_var(
+            "MetaData/sensorScanPosition",
+            dtype=scanpos2.astype(np.int32).dtype,
+            fillval=int32_fill_value,
+        ).write_attr("long_name", "Sensor Scan Position").write_data(scanpos2)
+
+        # Sensor Zenith Angle
+        obsspace.create_var(
+            "MetaData/sensorZenithAngle",
+            dtype=satzenang2.dtype,
+            fillval=satzenang2.fill_value,
+        ).write_attr("units", "degree").write_attr(
+            "valid_range", np.array([0, 90], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Sensor Zenith Angle"
+        ).write_data(
+            satzenang2
+        )
+
+        # Sensor Azimuth Angle
+        obsspace.create_var(
+            "MetaData/sensorAzimuthAngle",
+            dtype=np.float32,
+            fillval=sataziang2.fill_value,
+        ).write_attr("units", "degree").write_attr(
+            "valid_range", np.array([0, 360], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Sensor Azimuth Angle"
+        ).write_data(
+            sataziang2
+        )
+
+        # Solar Azimuth Angle
+        obsspace.create_var(
+            "MetaData/solarAzimuthAngle",
+            dtype=np.float32,
+            fillval=solaziang2.fill_value,
+        ).write_attr("units", "degree").write_attr(
+            "valid_range", np.array([0, 360], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Solar Azimuth Angle"
+        ).write_data(
+            solaziang2
+        )
+
+        # Sensor View Angle
+        obsspace.create_var(
+            "MetaData/sensorViewAngle",
+            dtype=np.float32,
+            fillval=viewang2.fill_value,
+        ).write_attr("units", "degree").write_attr(
+            "long_name", "Sensor View Angle"
+        ).write_data(
+            viewang2
+        )
+
+        # Solar Zenith Angle
+        obsspace.create_var(
+            "MetaData/solarZenithAngle",
+            dtype=solzenang2.dtype,
+            fillval=solzenang2.fill_value,
+        ).write_attr("units", "degree").write_attr(
+            "valid_range", np.array([0, 180], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Solar Zenith Angle"
+        ).write_data(
+            solzenang2
+        )
+
+        # Cloud free
+        obsspace.create_var(
+            "MetaData/cloudFree",
+            dtype=cldFree2.dtype, fillval=int32_fill_value
+        ).write_attr("units", "1").write_attr(
+            "valid_range", np.array([0, 100], dtype=np.int32)
+        ).write_attr(
+            "long_name", "Amount Segment Cloud Free"
+        ).write_data(
+            cldFree2
+        )
+
+        # Cloud amount based on computation
+        obsspace.create_var(
+            "MetaData/cloudAmount",
+            dtype=cloudAmount2.dtype,
+            fillval=cloudAmount2.fill_value,
+        ).write_attr("units", "1").write_attr(
+            "valid_range", np.array([0, 100], dtype=np.float32)
+        ).write_attr(
+            "long_name", "Amount of cloud coverage in layer"
+        ).write_data(
+            cloudAmount2
+        )
+
+        # ObsType based on computation method/spectral band
+        obsspace.create_var(
+            "ObsValue/brightnessTemperature",
+            dim_list=["Location", "Channel"],
+            dtype=np.float32,
+            fillval=BT2.fill_value,
+        ).write_attr("units", "k").write_attr(
+            "long_name", "Brightness Temperature"
+        ).write_data(
+            BT2
+        )
+
+        obsspace.create_var(
+            "ClearSkyStdDev/brightnessTemperature",
+            dim_list=["Location", "Channel"],
+            dtype=np.float32,
+            fillval=clrStdDev2.fill_value,
+        ).write_attr(
+            "long_name", "Standard Deviation Brightness Temperature"
+        ).write_data(
+            clrStdDev2
+        )
+
+    end_time = time.time()
+    running_time = end_time - start_time
+
+    return len(satid2), unique_timestamp2, running_time
+
+
 if __name__ == "__main__":
     start_time = time.time()
 
@@ -542,6 +629,9 @@ if __name__ == "__main__":
     parser.add_argument(
         "-v", "--verbose", help="print debug logging information", action="store_true"
     )
+    parser.add_argument(
+        "-j", "--workers", type=int, help="number of processes writing the IODA files"
+    )
     args = parser.parse_args()
 
     log_level = "DEBUG" if args.verbose else "INFO"
@@ -549,6 +639,8 @@ if __name__ == "__main__":
 
     with open(args.config, "r") as json_file:
         config = json.load(json_file)
+    if args.workers is not None:
+        config["workers"] = args.workers
 
     bufr_to_ioda(config, logger)
 
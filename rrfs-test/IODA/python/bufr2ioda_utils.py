@@ -0,0 +1,273 @@
+# (C) Copyright 2024 NOAA/NWS/NCEP/EMC
+#
+# This software is licensed under the terms of the Apache Licence Version 2.0
+# which can be obtained at http://www.apache.org/licenses/LICENSE-2.0.
+
+# Helpers shared by the bufr2ioda_*.py converters. The converters are run as
+# scripts from this directory, so they import these with
+#     from bufr2ioda_utils import Mask_typ_for_var, Compute_dateTime
+
+import numpy as np
+import numpy.ma as ma
+
+EARTH_RADIUS_KM = 6371.
+
+
+def Mask_typ_for_var(typ, var):
+    """
+    Copy of the observation type array typ with typ.fill_value wherever var
+    is masked, so that each variable gets its own observation type.
+    """
+
+    typ_var = typ.copy()
+    typ_var[ma.getmaskarray(var)] = typ.fill_value
+
+    return typ_var
+
+
+def Compute_dateTime(cycleTimeSinceEpoch, dhr):
+    """
+    dateTime in seconds since epoch from DHR offsets dhr (already in seconds)
+    relative to the cycle time, masked with fill value 0 wherever dhr is
+    masked.
+    """
+
+    int64_fill_value = np.int64(0)
+    dateTime = np.where(ma.getmaskarray(dhr), int64_fill_value,
+                        ma.filled(dhr, 0).astype(np.int64) + cycleTimeSinceEpoch)
+    dateTime = ma.masked_values(dateTime, int64_fill_value)
+
+    return dateTime
+
+
+def Compute_dateTime_from_fields(year, month, day, hour, minute=None, second=None):
+    """
+    dateTime in seconds since epoch from the BUFR YEAR, MNTH, DAYS, HOUR and
+    optional MINU, SECO arrays, masked with fill value 0 wherever one of them
+    is masked.
+
+    The converters used r.get_datetime(...).astype(np.int64) followed by
+    ma.masked_values(timestamp, 0). astype keeps the mask of get_datetime,
+    and masked_values fills the masked reports with 0 before masking zeros,
+    so those reports came out as data 0, masked, fill value 0, whatever fill
+    value get_datetime itself carried. This assumes get_datetime masks a
+    report when any of its fields is missing; a report it did not mask is
+    masked here instead.
+    """
+
+    int64_fill_value = np.int64(0)
+    fields = [year, month, day, hour, minute, second]
+    missing = np.zeros(np.shape(year), dtype=bool)
+    for i, field in enumerate(fields):
+        if field is None:
+            fields[i] = np.zeros(np.shape(year), dtype=np.int64)
+        else:
+            missing |= ma.getmaskarray(field)
+            fields[i] = ma.filled(field, 0).astype(np.int64)
+    year, month, day, hour, minute, second = fields
+
+    # Days since 1970-01-01 of the proleptic Gregorian calendar date, counting
+    # years from March so that the leap day is the last day of the year
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+
+    dateTime = days * 86400 + hour * 3600 + minute * 60 + second
+    dateTime = np.where(missing, int64_fill_value, dateTime)
+    dateTime = ma.masked_values(dateTime, int64_fill_value)
+
+    return dateTime
+
+
+def Compute_WindComponents_from_WindDirection_and_WindSpeed(wdir, wspd):
+
+    uob = (-wspd * np.sin(np.radians(wdir))).astype(np.float32)
+    vob = (-wspd * np.cos(np.radians(wdir))).astype(np.float32)
+
+    uob = ma.array(uob)
+    uob = ma.masked_values(uob, uob.fill_value)
+    vob = ma.array(vob)
+    vob = ma.masked_values(vob, vob.fill_value)
+
+    return uob, vob
+
+
+def Bin_index(var, width=None):
+    """
+    Integer bin of each value of var: floor(var / width), or without a width
+    the rank of the value among the distinct values of var (for identifiers,
+    including strings). Masked values are put in bin 0; leave them out with
+    ma.getmaskarray(var).
+    """
+
+    mask = ma.getmaskarray(var)
+    data = ma.getdata(var)
+    if width is None:
+        return np.unique(data, return_inverse=True)[1].reshape(-1).astype(np.int64)
+    data = np.where(mask, 0, data).astype(np.float64)
+    return np.floor(data / width).astype(np.int64)
+
+
+def Superob_groups(bins):
+    """
+    Sort the locations by their bins, the first of the bin index arrays
+    varying slowest, and return the order and the start of each superob in
+    it. The sort is stable, so each superob keeps the order of its locations.
+    """
+
+    # Combine the bin indices into one int64 key when their ranges allow it,
+    # sorting one key is much faster than a lexsort of several
+    key = np.zeros(len(bins[0]), dtype=np.int64)
+    size = 1
+    for index in bins:
+        if len(index) == 0:
+            break
+        span = int(index.max()) - int(index.min()) + 1
+        size *= span
+        if size > np.iinfo(np.int64).max:
+            key = None
+            break
+        key = key * span + (index - index.min())
+
+    if key is None:
+        order = np.lexsort(bins[::-1])
+        new = np.zeros(len(order), dtype=bool)
+        for index in bins:
+            sorted_index = index[order]
+            new[1:] |= sorted_index[1:] != sorted_index[:-1]
+    else:
+        order = np.argsort(key, kind='stable')
+        sorted_key = key[order]
+        new = np.empty(len(order), dtype=bool)
+        new[1:] = sorted_key[1:] != sorted_key[:-1]
+    new[:1] = True
+    return order, np.flatnonzero(new)
+
+
+def Superob_mean(var, order, starts):
+    """
+    Mean, count and spread (standard deviation) of the unmasked values of var
+    in each superob of Superob_groups. The mean and spread are float64, masked
+    where a superob has no values.
+    """
+
+    valid = ~ma.getmaskarray(var)[order]
+    values = np.where(valid, ma.getdata(var)[order], 0).astype(np.float64)
+    count = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(values, starts) / count
+        deviation = np.where(valid, values - np.repeat(mean, np.diff(np.append(starts, len(order)))), 0)
+        spread = np.sqrt(np.add.reduceat(deviation * deviation, starts) / count)
+
+    return ma.array(mean, mask=count == 0), count, ma.array(spread, mask=count == 0)
+
+
+def Latlon_mesh_cells(lat, lon, resolution):
+    """
+    Index of the cell of the regular lat/lon mesh of the given resolution
+    (degrees) that contains each point, rows from the south pole and columns
+    from longitude 0 eastward.
+    """
+
+    ncols = int(round(360. / resolution))
+    row = np.floor((ma.getdata(lat).astype(np.float64) + 90.) / resolution).astype(np.int64)
+    col = np.floor((ma.getdata(lon).astype(np.float64) % 360.) / resolution).astype(np.int64) % ncols
+    return row * ncols + col
+
+
+def Latlon_mesh_centers(cell, resolution):
+    """
+    Latitude, longitude (-180 to 180) and area (km2) of the cells of the
+    regular lat/lon mesh of Latlon_mesh_cells.
+    """
+
+    ncols = int(round(360. / resolution))
+    row, col = np.divmod(cell, ncols)
+    south = np.radians(np.clip(row * resolution - 90., -90., 90.))
+    north = np.radians(np.clip((row + 1) * resolution - 90., -90., 90.))
+    lat = np.clip((row + 0.5) * resolution - 90., -90., 90.)
+    lon = (col + 0.5) * resolution
+    lon = np.where(lon > 180., lon - 360., lon)
+    area = EARTH_RADIUS_KM**2 * np.radians(resolution) * (np.sin(north) - np.sin(south))
+    return lat, lon, area
+
+
+def Model_grid_cells(grid_filename, lat, lon):
+    """
+    Index of the nearest cell center of a regional FV3 grid spec (grid_latt/
+    grid_lont, area) or MPAS (latCell/lonCell, areaCell) grid to each point,
+    -1 for the points farther from the grid than its spacing (outside the
+    domain), with the latitude, longitude and area (km2) of all the cells.
+    The grid_lat/grid_lon corners of an FV3 grid spec are not used.
+    """
+
+    import netCDF4 as nc
+    from scipy.spatial import cKDTree
+
+    with nc.Dataset(grid_filename, 'r') as grid_ds:
+        if 'grid_latt' in grid_ds.variables:
+            grid_lat = np.asarray(grid_ds.variables['grid_latt'][:]).flatten()
+            grid_lon = np.asarray(grid_ds.variables['grid_lont'][:]).flatten()
+            grid_area = np.asarray(grid_ds.variables['area'][:]).flatten() / 1e6
+        elif 'latCell' in grid_ds.variables:
+            grid_lat = np.degrees(np.asarray(grid_ds.variables['latCell'][:]))
+            grid_lon = np.degrees(np.asarray(grid_ds.variables['lonCell'][:]))
+            radius = getattr(grid_ds, 'sphere_radius', 1.)
+            grid_area = np.asarray(grid_ds.variables['areaCell'][:]) * (EARTH_RADIUS_KM * 1000. / radius)**2 / 1e6
+        else:
+            raise ValueError("Unrecognized grid format: 'grid_latt'/'grid_lont' or 'latCell'/'lonCell' not found.")
+    if not len(grid_lat) == len(grid_lon) == len(grid_area):
+        raise ValueError(f"Grid {grid_filename} has {len(grid_lat)} latitudes, {len(grid_lon)} longitudes "
+                         f"and {len(grid_area)} areas; the cell centers and areas must match.")
+
+    def unit_vectors(lat, lon):
+        lat = np.radians(lat)
+        lon = np.radians(lon)
+        return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+    tree = cKDTree(unit_vectors(grid_lat, grid_lon))
+    sample = np.linspace(0, len(grid_lat) - 1, min(len(grid_lat), 1000)).astype(np.int64)
+    spacing = np.median(tree.query(tree.data[sample], k=2)[0][:, 1])
+    distance, cell = tree.query(unit_vectors(ma.getdata(lat).astype(np.float64), ma.getdata(lon).astype(np.float64)))
+    cell[distance > spacing] = -1
+
+    grid_lon = np.where(grid_lon > 180., grid_lon - 360., grid_lon)
+    return cell.astype(np.int64), grid_lat, grid_lon, grid_area
+
+
+def Superob_median(var, order, starts):
+    """
+    Median of the unmasked values of var in each superob of Superob_groups,
+    float64, masked where a superob has no values.
+    """
+
+    group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(order))))
+    valid = ~ma.getmaskarray(var)[order]
+    values = ma.getdata(var)[order][valid].astype(np.float64)
+    group = group[valid]
+    count = np.bincount(group, minlength=len(starts))
+    if len(values) == 0:
+        return ma.masked_all(len(starts), dtype=np.float64)
+
+    # Sort the values within each superob and average its middle two
+    sorted_values = values[np.lexsort((values, group))]
+    first = np.cumsum(count) - count
+    low = np.minimum(first + (count - 1) // 2, len(values) - 1)
+    high = np.minimum(first + count // 2, len(values) - 1)
+    median = (sorted_values[low] + sorted_values[high]) / 2.
+
+    return ma.array(median, mask=count == 0)
+
+
+def Superob_nearest(distance, order, starts):
+    """
+    Location nearest to the center of each superob of Superob_groups, given
+    the distance of each location to the center of its superob; the first
+    of them on a tie.
+    """
+
+    group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(order))))
+    return order[np.lexsort((distance[order], group))[starts]]
@@ -45,18 +45,61 @@ PYIODALIB=`echo $DIR_ROOT/build/lib/python3.*`
 export PYTHONPATH=${PYIODALIB}:${PYTHONPATH}
 
 #----- python and json -----
-# first specify what observation types will be processed by a script
-BUFR_py="msonet_prepbufr"
+# first specify what observation types will be processed by a script; msonet, nexrad,
+# lghtng, lgycld and efclam can be added, all converted by bufr2ioda_engine.py, e.g.
+#   BUFR_py="msonet_prepbufr nexrad lghtng" run_bufr2ioda.sh ...
+BUFR_py=${BUFR_py:-"msonet_prepbufr"}
+# with BUFR2IODA_SINGLE_PASS=YES the obtypes converted by the generic engine are run
+# together in one python process; those reading the same BUFR file with the same subsets
+# also share one decode of it (none of the templates above read the same file)
+BUFR2IODA_SINGLE_PASS=${BUFR2IODA_SINGLE_PASS:-"NO"}
+# with BUFR2IODA_COMPARE=YES the single pass also decodes each obtype sharing a decode on its
+# own and reports the decode time saved for the cycle; this costs those extra decodes
+BUFR2IODA_COMPARE=${BUFR2IODA_COMPARE:-"NO"}
+engine_flags=""
+if [[ $BUFR2IODA_COMPARE == "YES" ]]; then
+  engine_flags="--compare"
+fi
+engine_configs=""
+# with NEXRAD_QC=YES nexrad gates with a missing radial velocity, beyond 230 km or with a
+# radial velocity above the unfolding (Nyquist) velocity are dropped before output
+export NEXRAD_QC=${NEXRAD_QC:-"NO"}
+# with NEXRAD_SUPEROB=YES the nexrad radial winds are averaged in station/tilt/azimuth/range bins
+export NEXRAD_SUPEROB=${NEXRAD_SUPEROB:-"NO"}
+# with NEXRAD_SPLIT=YES each radar station is processed in its own worker and written to its own
+# file, or with NEXRAD_SPLIT_MERGE=YES to the one nexrad file
+export NEXRAD_SPLIT=${NEXRAD_SPLIT:-"NO"}
+export NEXRAD_SPLIT_MERGE=${NEXRAD_SPLIT_MERGE:-"NO"}
+# with LGHTNG_GRID=YES lightning strikes are counted in 0.1 degree cells, or at the points of the
+# model grid in LGHTNG_GRID_FILE, and 10 minute bins
+export LGHTNG_GRID=${LGHTNG_GRID:-"NO"}
+export LGHTNG_GRID_FILE=${LGHTNG_GRID_FILE:-""}
+# with CLOUD_SUPEROB=YES the lgycld and efclam GOES cloud pixels are combined in boxes of
+# CLOUD_SUPEROB_BOX degrees, by their mean, median or the pixel nearest to the box center
+export CLOUD_SUPEROB=${CLOUD_SUPEROB:-"NO"}
+export CLOUD_SUPEROB_METHOD=${CLOUD_SUPEROB_METHOD:-"mean"}
+export CLOUD_SUPEROB_BOX=${CLOUD_SUPEROB_BOX:-"0.1"}
+engine_obtypes=""
 
 for obtype in $BUFR_py; do
-  # this loop assumes that there is a python script and template with the same name
+  # this loop assumes that there is a template with the same name, and uses the python
+  # script of that name if there is one, otherwise the generic converter engine
   echo "Processing ${obtype}..."
 
   # first generate a JSON from the template
   ${BUFRJSONGEN} -t ${config_template_dir}/bufr2ioda_${obtype}.json -o ${COM_OBS}/${obtype}_${PDY}${cyc}.json
 
   # now use the converter script for the ob type
-  python $USH_IODA/bufr2ioda_${obtype}.py -c ${COM_OBS}/${obtype}_${PDY}${cyc}.json
+  converter=$USH_IODA/bufr2ioda_${obtype}.py
+  if [[ ! -f $converter ]]; then
+    converter=$USH_IODA/bufr2ioda_engine.py
+  fi
+  if [[ $BUFR2IODA_SINGLE_PASS == "YES" ]] && grep -q "bufr2ioda_engine" $converter; then
+    engine_configs="${engine_configs} ${COM_OBS}/${obtype}_${PDY}${cyc}.json"
+    engine_obtypes="${engine_obtypes} ${obtype}"
+    continue
+  fi
+  python $converter -c ${COM_OBS}/${obtype}_${PDY}${cyc}.json
 
   # check if converter was successful
   if [ $? == 0 ]; then
@@ -68,6 +111,28 @@ for obtype in $BUFR_py; do
   fi
 done
 
+if [[ -n $engine_configs ]]; then
+  echo "Processing${engine_obtypes} in a single pass..."
+  # an obtype that fails does not stop the others; the engine logs each failed JSON file
+  engine_log=${COM_OBS}/bufr2ioda_engine_${PDY}${cyc}.log
+  python $USH_IODA/bufr2ioda_engine.py -c ${engine_configs} ${engine_flags} 2>&1 | tee ${engine_log}
+  engine_status=${PIPESTATUS[0]}
+  if [ $engine_status == 0 ]; then
+    rm -rf ${engine_configs} ${engine_log}
+  elif grep -qF "Conversion failed for" ${engine_log}; then
+    for obtype in $engine_obtypes; do
+      if grep -qF "Conversion failed for ${COM_OBS}/${obtype}_${PDY}${cyc}.json" ${engine_log}; then
+        # warn and keep the JSON file
+        echo "Problem running converter engine for ${obtype}"
+      else
+        rm -rf ${COM_OBS}/${obtype}_${PDY}${cyc}.json
+      fi
+    done
+  else
+    echo "Problem running converter engine for${engine_obtypes}"
+  fi
+fi
+
 #----------------------------
 #---- bufr2ioda and yaml ----
 BUFR_yaml=""